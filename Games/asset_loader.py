@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+# Imported ahead of pygame by the entry scripts, so this is close to when the
+# process started
+STARTED = time.perf_counter()
+
+# Set GAMES_DEBUG=1 to print load timings and time to the first playable frame
+DEBUG = os.environ.get("GAMES_DEBUG") == "1"
+
+
+def since_start():
+    return time.perf_counter() - STARTED
+
+
+# Runs (label, function) loading tasks in order on a background thread while
+# the main thread keeps drawing a progress screen. progress and current can
+# be read at any time; wait() re-raises anything a task raised.
+class AssetLoader:
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.done = 0
+        self.current = None
+        self.error = None
+        self.timings = []
+        self.thread = threading.Thread(target=self.load, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def load(self):
+        try:
+            for label, task in self.tasks:
+                self.current = label
+                start = time.perf_counter()
+                task()
+                self.timings.append((label, time.perf_counter() - start))
+                self.done += 1
+        except Exception as e:
+            self.error = e
+        self.current = None
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def progress(self):
+        return self.done / len(self.tasks) if self.tasks else 1.0
+
+    @property
+    def ready(self):
+        return not self.thread.is_alive()
+
+    def wait(self):
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        if DEBUG:
+            steps = ", ".join(f"{label} {seconds * 1000:.0f} ms" for label, seconds in self.timings)
+            print(f"[load] {steps}; {self.elapsed * 1000:.0f} ms total")
+
+
+first_frame_reported = False
+
+
+def report_first_frame():
+    global first_frame_reported
+    if DEBUG and not first_frame_reported:
+        first_frame_reported = True
+        print(f"[load] first playable frame {since_start() * 1000:.0f} ms after start")
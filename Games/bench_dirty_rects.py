@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from dirty_rects import DirtyRenderer
+from text_cache import get_font, render_text
+
+# Fill-rate comparison between full-screen repaints and dirty rects for a
+# typical Ship vs Monster frame: the ship, a monster, a stream of bullets
+# and the HUD, drawn over a flat background at several window sizes.
+SIZES = [(800, 600), (1280, 720), (1920, 1080), (2560, 1440)]
+FRAMES = 300
+BULLETS = 40
+
+BG = (20, 20, 40)
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+
+
+def draw_frame(renderer, frame, width, height):
+    surface = renderer.surface
+    renderer.begin(BG)
+    ship = pygame.Rect(0, 0, 50, 40)
+    ship.center = (width // 2 + (frame * 5) % 200 - 100, height - 50)
+    renderer.mark(surface.fill(GREEN, ship))
+    monster = pygame.Rect(0, 0, 100, 80)
+    monster.center = ((frame * 4) % (width - 100) + 50, 100)
+    renderer.mark(surface.fill(RED, monster))
+    for i in range(BULLETS):
+        y = height - 60 - ((frame * 10 + i * 37) % (height - 100))
+        renderer.mark(pygame.draw.rect(surface, WHITE, (ship.centerx - 20 + (i % 4) * 13, y, 5, 10)))
+    font = get_font("Arial", 30)
+    renderer.blit(render_text(font, "Level: 3", WHITE), (10, 10))
+    renderer.blit(render_text(font, f"Score: {frame // 60 * 100}", WHITE), (10, 40))
+    renderer.blit(render_text(font, "High Score: 1600", WHITE), (10, 70))
+    renderer.present()
+
+
+def measure(size, dirty):
+    surface = pygame.display.set_mode(size)
+    renderer = DirtyRenderer(surface, enabled=dirty)
+    pixels = 0
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        draw_frame(renderer, frame, *size)
+        pixels += renderer.pixels
+    elapsed = time.perf_counter() - start
+    return elapsed / FRAMES * 1000, pixels / FRAMES
+
+
+def main():
+    pygame.init()
+    get_font("Arial", 30)
+    print(f"{'size':>11} {'full ms':>8} {'dirty ms':>9} {'full px':>10} {'dirty px':>9} {'saved':>6}")
+    for size in SIZES:
+        full_ms, full_px = measure(size, False)
+        dirty_ms, dirty_px = measure(size, True)
+        print(f"{size[0]:>5}x{size[1]:<5} {full_ms:8.3f} {dirty_ms:9.3f} {full_px:10.0f} {dirty_px:9.0f} "
+              f"{1 - dirty_px / full_px:6.1%}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
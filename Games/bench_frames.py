@@ -0,0 +1,211 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from dirty_rects import DirtyRenderer, DIRTY_RECTS
+from tower_engine import TowerEngine, chase_batch, chase_policy
+
+# Frame-time benchmarks: each scenario sets a game up in a fixed state from a
+# fixed seed, then runs one simulation step plus one full draw and present per
+# frame, exactly as the game loops do at 60 FPS, and reports percentiles,
+# throughput and allocations as JSON. Run it on two commits with --out and
+# --compare to see what changed.
+FRAMES = 600
+WARMUP = 60
+SEED = 1
+
+
+def tower_setup(level=1, heaven=False):
+    import tower_jump_1player as game
+    surface = pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+    game.screen = surface
+    game.renderer = DirtyRenderer(surface)
+    game.load_assets()
+    game.reset_effects(SEED)
+    engine = TowerEngine(game.WIDTH, game.HEIGHT, rng=random.Random(SEED))
+
+    def start():
+        engine.reset()
+        engine.level = level
+        engine.score = (level - 1) * 100
+        engine.win = heaven
+
+    start()
+
+    def frame():
+        if heaven:
+            engine.step(0)
+            game.sparkles.update()
+        else:
+            engine.step(chase_policy(engine))
+            if engine.level > 50:
+                game.clouds.update()
+        game.draw_frame(engine, 1.0, 0, heaven)
+        if engine.game_over or (engine.win and not heaven):
+            start()
+
+    return frame
+
+
+def tower_split_setup(players):
+    import tower_jump_2player as game
+    game.screen = pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+    game.configure(players)
+    batch = game.batch
+    batch.reset(SEED)
+
+    def frame():
+        batch.step(chase_batch(batch))
+        if (batch.game_over | batch.win).any():
+            batch.reset(SEED)
+        game.draw_frame(1.0)
+
+    return frame
+
+
+def ship_boss_setup():
+    import ship_vs_monster as game
+    surface = pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+    game.win = surface
+    game.renderer = DirtyRenderer(surface)
+    session = game.Session(SEED)
+    session.player.bullet_level = 4
+
+    def frame():
+        if not session.monster.is_boss:
+            session.level = 10
+            session.monster = game.Monster(session.level, session.rng)
+        inputs = game.SHOOT if session.clock.frame % 6 == 0 else 0
+        dx = session.monster.rect.centerx - session.player.rect.centerx
+        if dx < -10: inputs |= game.LEFT
+        if dx > 10: inputs |= game.RIGHT
+        session.update(inputs)
+        session.boss_intro_pending = False
+        session.player.lives = 3  # the boss never wins
+        session.draw()
+
+    return frame
+
+
+SCENARIOS = {
+    "tower_jump_level_1": lambda: tower_setup(1),
+    "tower_jump_level_90": lambda: tower_setup(90),
+    "tower_jump_heaven": lambda: tower_setup(100, heaven=True),
+    "tower_jump_2p": lambda: tower_split_setup(2),
+    "tower_jump_4p": lambda: tower_split_setup(4),
+    "tower_jump_8p": lambda: tower_split_setup(8),
+    "ship_boss_max_bullets": ship_boss_setup,
+}
+
+
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+
+def measure(setup, frames):
+    frame = setup()
+    for _ in range(WARMUP):
+        frame()
+    times = []
+    collections = gc.get_stats()[0]["collections"]
+    start = time.perf_counter()
+    for _ in range(frames):
+        t = time.perf_counter()
+        frame()
+        times.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    collections = gc.get_stats()[0]["collections"] - collections
+
+    # Allocations on a second, identical run, so tracing doesn't skew the timings
+    frame = setup()
+    for _ in range(WARMUP):
+        frame()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(frames):
+        frame()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        "frames": frames,
+        "fps": frames / elapsed,
+        "mean_ms": elapsed / frames * 1000,
+        "p50_ms": percentile(times, 50) * 1000,
+        "p95_ms": percentile(times, 95) * 1000,
+        "p99_ms": percentile(times, 99) * 1000,
+        "max_ms": times[-1] * 1000,
+        "gc_gen0": collections,
+        "alloc_net_kib": (after - before) / 1024,
+        "alloc_peak_kib": (peak - before) / 1024,
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(base, results):
+    print(f"{'scenario':<24} {'p50':>16} {'p95':>16} {'p99':>16}", file=sys.stderr)
+    for name, result in results.items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            change = result[key] / old[key] - 1 if old[key] else 0
+            cells.append(f"{result[key]:7.3f} ({change:+6.1%})")
+        print(f"{name:<24} " + " ".join(cells), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmarks")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--only", nargs="*", choices=list(SCENARIOS), help="scenarios to run")
+    parser.add_argument("--out", help="also write the JSON results here")
+    parser.add_argument("--compare", help="JSON results from an earlier run to compare against")
+    args = parser.parse_args()
+
+    pygame.init()
+    results = {name: measure(SCENARIOS[name], args.frames) for name in args.only or SCENARIOS}
+    report = {
+        "meta": {
+            "commit": commit(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "machine": platform.machine(),
+            "dirty_rects": DIRTY_RECTS,
+            "seed": SEED,
+            "warmup": WARMUP,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from bench_frames import percentile
+from fixed_step import STEP_RATE
+from tower_engine import chase_policy
+from tower_net import EMPTY, Client, Server, encode_delta, view_seats
+
+# Loopback benchmark and end-to-end check for networked Tower Jump. For each
+# client count, a Server and that many bot Clients play over 127.0.0.1 in one
+# event loop, with simulated latency, each bot steering its predicted game
+# with chase_policy. Reports bandwidth per player each way, server tick cost
+# and how often prediction was right, and exits non-zero if any client's copy
+# of a seat it shows ended up different from the server's.
+CLIENTS = [2, 8, 32]
+SECONDS = 10
+LATENCY_MS = 40
+JITTER_MS = 10
+SEED = 1
+
+
+# Steps every bot at STEP_RATE from its first snapshot until the server says goodbye
+async def drive(clients):
+    loop = asyncio.get_running_loop()
+    due = loop.time()
+    while not all(client.closed.is_set() for client in clients):
+        for client in clients:
+            if client.started.is_set():
+                client.tick(chase_policy(client.engine))
+        due += 1 / STEP_RATE
+        await asyncio.sleep(max(0.0, due - loop.time()))
+
+
+async def session(count, seconds, latency, jitter, seed):
+    server = Server(count, seed, latency, jitter)
+    port = await server.start("127.0.0.1", 0)
+    clients = [Client(f"Bot {i + 1}", latency, jitter) for i in range(count)]
+    for client in clients:
+        await client.connect("127.0.0.1", port)
+    start = time.perf_counter()
+    bots = asyncio.create_task(drive(clients))
+    await server.run(int(seconds * STEP_RATE))
+    await bots
+    elapsed = time.perf_counter() - start
+    for client in clients:
+        await client.close()
+
+    ticks = sorted(server.tick_times)
+    snapshots = [client.snapshots for client in clients]
+    full = [len(b"".join(encode_delta(s, EMPTY, server.states[s]) for s in view_seats(seat, count)))
+            for seat in range(count)]
+    mismatched = [client.seat for client in clients
+                  if any(client.states.get(s) != server.states[s] for s in client.view)]
+    return {
+        "clients": count,
+        "seconds": elapsed,
+        "ticks": server.tick_count,
+        "down_bps": statistics.mean(client.received for client in clients) / elapsed,
+        "up_bps": statistics.mean(client.link.sent for client in clients) / elapsed,
+        "snapshot_bytes": statistics.mean(client.received / max(n, 1) for client, n in zip(clients, snapshots)),
+        "full_snapshot_bytes": statistics.mean(full),
+        "tick_p50_ms": percentile(ticks, 50) * 1000,
+        "tick_p95_ms": percentile(ticks, 95) * 1000,
+        "tick_max_ms": ticks[-1] * 1000,
+        "checked": sum(client.checked for client in clients),
+        "mispredictions": sum(client.mispredictions for client in clients),
+        "best_level": max(fields[6] for fields, _ in server.states),
+        "mismatched_seats": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loopback benchmark for networked Tower Jump")
+    parser.add_argument("--clients", type=int, nargs="*", default=CLIENTS)
+    parser.add_argument("--seconds", type=float, default=SECONDS, help="game time per client count")
+    parser.add_argument("--latency", type=float, default=LATENCY_MS, help="simulated one-way latency in ms")
+    parser.add_argument("--jitter", type=float, default=JITTER_MS, help="extra random delay of up to this many ms")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = [asyncio.run(session(count, args.seconds, args.latency / 1000, args.jitter / 1000, args.seed))
+               for count in args.clients]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.seconds:.0f}s per run, {args.latency:.0f} ms latency + up to {args.jitter:.0f} ms jitter each way")
+        print("clients  down B/s  up B/s  snapshot B  (full)  tick p50  p95 ms  mispredicted  best level  state")
+        for r in results:
+            missed = r["mispredictions"] / r["checked"] if r["checked"] else 0.0
+            state = "match" if not r["mismatched_seats"] else f"MISMATCH {r['mismatched_seats']}"
+            print(f"  {r['clients']:5d}  {r['down_bps']:8.0f}  {r['up_bps']:6.0f}  {r['snapshot_bytes']:10.1f}  "
+                  f"{r['full_snapshot_bytes']:6.0f}  {r['tick_p50_ms']:8.3f}  {r['tick_p95_ms']:6.3f}  "
+                  f"{missed:12.2%}  {r['best_level']:10d}  {state}")
+    return 1 if any(r["mismatched_seats"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
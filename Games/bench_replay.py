@@ -0,0 +1,148 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from bench_frames import percentile
+from fixed_step import STEP_RATE
+from replay import KeyframeRecorder, Recorder, ReplayFile, new_simulation, replay
+
+# Size, load and seek benchmarks for binary replays, and a check that seeking
+# lands on the right state. Records a planner-driven Tower Jump run to level
+# 100 and a long Ship vs Monster session played by ship_balance's dodge
+# policy, as text and as binary with and without zlib, keeping the state
+# (as keyframe bytes) at a random sample of steps. Then times opening the
+# compressed replay and seeking to each sampled step, and compares where each
+# seek lands with the kept state. Exits non-zero on any difference.
+SEEKS = 200
+SHIP_MINUTES = 20
+TOWER_MAX_STEPS = 100000
+OPENS = 50
+SEED = 1
+
+
+def tower_policy(engine):
+    from tower_planner import Planner
+    return Planner(engine)
+
+
+def ship_policy(session):
+    from ship_balance import dodge_policy
+    return dodge_policy
+
+
+GAMES = {
+    # game: (policy factory, input bits, whether the run is over)
+    "tower_jump": (tower_policy, 2, lambda engine: engine.game_over or engine.win),
+    "ship_vs_monster": (ship_policy, 3, lambda session: session.game_over),
+}
+
+
+# Plays one run into every format, with a reservoir sample of SEEKS
+# (step, keyframe) pairs plus the final step
+def record(game, seed, max_steps, directory, rng):
+    make_policy, bits, over = GAMES[game]
+    sim, step = new_simulation({"game": game, "seed": seed})
+    policy = make_policy(sim)
+    recorders = {
+        "text": Recorder(game, seed, os.path.join(directory, "text")),
+        "binary": KeyframeRecorder(game, seed, sim.keyframe, bits, os.path.join(directory, "binary"), compress=False),
+        "zlib": KeyframeRecorder(game, seed, sim.keyframe, bits, os.path.join(directory, "zlib")),
+    }
+    samples = []
+    steps = 0
+    start = time.perf_counter()
+    while steps < max_steps and not over(sim):
+        if len(samples) < SEEKS:
+            samples.append((steps, sim.keyframe()))
+        else:
+            j = rng.randrange(steps + 1)
+            if j < SEEKS:
+                samples[j] = (steps, sim.keyframe())
+        inputs = policy(sim)
+        for recorder in recorders.values():
+            recorder.record(inputs)
+        step(inputs)
+        steps += 1
+    elapsed = time.perf_counter() - start
+    samples.append((steps, sim.keyframe()))
+    summary = sim.summary()
+    for recorder in recorders.values():
+        recorder.close(summary)
+    paths = {name: recorder.path for name, recorder in recorders.items()}
+    return paths, samples, summary, elapsed
+
+
+def measure(game, seed, max_steps, directory):
+    rng = random.Random(seed)
+    paths, samples, summary, recorded = record(game, seed, max_steps, directory, rng)
+
+    opens = []
+    for _ in range(OPENS):
+        start = time.perf_counter()
+        ReplayFile(paths["zlib"]).close()
+        opens.append(time.perf_counter() - start)
+
+    rng.shuffle(samples)
+    seeks = []
+    mismatched = []
+    with ReplayFile(paths["zlib"]) as replay_file:
+        for step, expected in samples:
+            start = time.perf_counter()
+            sim = replay_file.seek(step)
+            seeks.append(time.perf_counter() - start)
+            if sim.keyframe() != expected:
+                mismatched.append(step)
+    seeks.sort()
+    return {
+        "game": game,
+        "steps": summary["frame"],
+        "minutes": summary["frame"] / STEP_RATE / 60,
+        "level": summary["level"],
+        "record_s": recorded,
+        "text_kib": os.path.getsize(paths["text"]) / 1024,
+        "binary_kib": os.path.getsize(paths["binary"]) / 1024,
+        "zlib_kib": os.path.getsize(paths["zlib"]) / 1024,
+        "open_ms": statistics.median(opens) * 1000,
+        "seek_mean_ms": statistics.mean(seeks) * 1000,
+        "seek_p95_ms": percentile(seeks, 95) * 1000,
+        "seek_max_ms": seeks[-1] * 1000,
+        "seeks": len(seeks),
+        "mismatched_steps": sorted(mismatched),
+        "replay_match": replay(paths["zlib"])["match"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary replay size, load and seek benchmarks")
+    parser.add_argument("--games", nargs="*", choices=list(GAMES), default=list(GAMES))
+    parser.add_argument("--ship-minutes", type=float, default=SHIP_MINUTES, help="game time cap for Ship vs Monster")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    limits = {"tower_jump": TOWER_MAX_STEPS, "ship_vs_monster": int(args.ship_minutes * 60 * STEP_RATE)}
+    with tempfile.TemporaryDirectory() as directory:
+        results = [measure(game, args.seed, limits[game], directory) for game in args.games]
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print("game              steps   min  level  text KiB  binary KiB  zlib KiB  open ms  "
+              "seek mean  p95  max ms  state")
+        for r in results:
+            ok = not r["mismatched_steps"] and r["replay_match"]
+            state = f"{r['seeks']} seeks match" if ok else f"MISMATCH at {r['mismatched_steps'][:5]}"
+            print(f"{r['game']:<16} {r['steps']:6d} {r['minutes']:5.1f} {r['level']:6d} {r['text_kib']:9.1f} "
+                  f"{r['binary_kib']:11.1f} {r['zlib_kib']:9.1f} {r['open_ms']:8.3f} {r['seek_mean_ms']:10.2f} "
+                  f"{r['seek_p95_ms']:4.1f} {r['seek_max_ms']:6.1f}  {state}")
+    return 1 if any(r["mismatched_steps"] or not r["replay_match"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import sys
+import time
+
+import numpy as np
+
+# Structure-of-arrays bullet pool: positions and speeds live in preallocated
+# NumPy arrays, live bullets packed at the front, so a whole volley is moved,
+# hit-tested and compacted in a few vector ops per step instead of one Rect
+# at a time. Firing writes into the next free slot and releasing swaps the
+# last live bullet into the hole, both O(1); the arrays only grow if a burst
+# overflows the preallocated capacity.
+class BulletSystem:
+    def __init__(self, width=5, height=10, capacity=1024):
+        self.width = width
+        self.height = height
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        n = self.count
+        for name, dtype in (("x", np.float32), ("y", np.float32), ("vy", np.float32),
+                            ("hit", np.bool_), ("dead", np.bool_), ("scratch", np.bool_)):
+            arr = np.zeros(capacity, dtype=dtype)
+            if n:
+                arr[:n] = getattr(self, name)[:n]
+            setattr(self, name, arr)
+
+    def __len__(self):
+        return self.count
+
+    def reserve(self, extra):
+        needed = self.count + extra
+        if needed > len(self.x):
+            self.allocate(max(needed, len(self.x) * 2))
+
+    def acquire(self, x, y, vy):
+        self.reserve(1)
+        i = self.count
+        self.x[i] = x - self.width // 2
+        self.y[i] = y
+        self.vy[i] = vy
+        self.count = i + 1
+        return i
+
+    def release(self, i):
+        last = self.count - 1
+        if i != last:
+            self.x[i] = self.x[last]
+            self.y[i] = self.y[last]
+            self.vy[i] = self.vy[last]
+        self.count = last
+
+    # xs are bullet centers; y is the top edge for every bullet in the volley
+    def spawn_many(self, xs, y, vy):
+        k = len(xs)
+        self.reserve(k)
+        n = self.count
+        self.x[n:n + k] = xs
+        self.x[n:n + k] -= self.width // 2
+        self.y[n:n + k] = y
+        self.vy[n:n + k] = vy
+        self.count = n + k
+
+    def update(self):
+        n = self.count
+        self.y[:n] += self.vy[:n]
+
+    # Mask of bullets overlapping rect, with Rect.colliderect edge rules. The
+    # mask is a view of a scratch buffer, valid until the next call.
+    def hits(self, rect):
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        hit, scratch = self.hit[:n], self.scratch[:n]
+        np.less(x, rect.right, out=hit)
+        np.greater(x, rect.left - self.width, out=scratch)
+        hit &= scratch
+        np.less(y, rect.bottom, out=scratch)
+        hit &= scratch
+        np.greater(y, rect.top - self.height, out=scratch)
+        hit &= scratch
+        return hit
+
+    def outside(self, top, bottom):
+        n = self.count
+        y = self.y[:n]
+        dead, scratch = self.dead[:n], self.scratch[:n]
+        np.less(y, top, out=dead)
+        np.greater(y, bottom, out=scratch)
+        dead |= scratch
+        return dead
+
+    # One step: move, then drop bullets that hit target or left the screen.
+    # Returns the centers of the bullets that hit.
+    def advance(self, target, top, bottom):
+        self.update()
+        hit = self.hits(target)
+        centers = []
+        if hit.any():
+            centers = list(self.centers(hit))
+        dead = self.outside(top, bottom)
+        dead |= hit
+        self.remove(dead)
+        return centers
+
+    def centers(self, mask):
+        n = self.count
+        return zip((self.x[:n][mask] + self.width / 2).tolist(), (self.y[:n][mask] + self.height / 2).tolist())
+
+    # Drop masked bullets. A handful are swap-released one by one; big
+    # clear-outs pack the survivors in one vectorized pass instead.
+    def remove(self, mask):
+        n = self.count
+        gone = np.flatnonzero(mask)
+        if len(gone) * 8 < n:
+            for i in gone[::-1].tolist():
+                self.release(i)
+        elif len(gone):
+            keep = ~mask
+            k = n - len(gone)
+            for arr in (self.x, self.y, self.vy):
+                arr[:k] = arr[:n][keep]
+            self.count = k
+
+    def clear(self):
+        self.count = 0
+
+    # Live bullets as bytes, the x, y and vy arrays one after another
+    def pack(self):
+        n = self.count
+        return self.x[:n].tobytes() + self.y[:n].tobytes() + self.vy[:n].tobytes()
+
+    # Replaces the live bullets with count bullets packed at offset in data.
+    # Returns the offset after them.
+    def unpack(self, data, offset, count):
+        self.count = 0
+        self.reserve(count)
+        for arr in (self.x, self.y, self.vy):
+            arr[:count] = np.frombuffer(data, np.float32, count, offset)
+            offset += count * 4
+        self.count = count
+        return offset
+
+    # Blit every bullet; positions are moved back along their velocity by
+    # (1 - alpha) of a step for interpolated rendering. Returns the dirty rects
+    # when asked for them.
+    def draw(self, surface, image, alpha=1.0, rects=False):
+        n = self.count
+        if not n:
+            return []
+        y = self.y[:n] - self.vy[:n] * (1 - alpha)
+        positions = zip(self.x[:n].astype(np.int32).tolist(), y.astype(np.int32).tolist())
+        return surface.blits([(image, pos) for pos in positions], doreturn=rects) or []
+
+
+if __name__ == "__main__":
+    # Step/collide/compact throughput with N bullets on screen
+    import pygame
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = np.random.default_rng(0)
+    bullets = BulletSystem()
+    target = pygame.Rect(350, 60, 100, 80)
+    steps = 1000
+    start = time.perf_counter()
+    for _ in range(steps):
+        if len(bullets) < count:
+            bullets.spawn_many(rng.uniform(0, 800, count - len(bullets)), 550, -10)
+        bullets.advance(target, 0, 600)
+    elapsed = time.perf_counter() - start
+    print(f"{count} bullets: {elapsed / steps * 1000:.3f} ms per step")
@@ -0,0 +1,64 @@
+import os
+
+import pygame
+
+# Set GAMES_DIRTY_RECTS=1 to only push changed regions to the display
+DIRTY_RECTS = os.environ.get("GAMES_DIRTY_RECTS") == "1"
+
+
+# Frame renderer that remembers where things were drawn. With dirty rects on,
+# begin() only paints the background back over last frame's drawings and
+# present() updates last frame's plus this frame's regions; with them off it
+# fills the whole screen and flips, like the games always did. Anything that
+# draws to the screen outside begin()/present() must call invalidate().
+class DirtyRenderer:
+    def __init__(self, surface, enabled=DIRTY_RECTS):
+        self.surface = surface
+        self.enabled = enabled
+        self.background = None
+        self.previous = []
+        self.current = []
+        self.full = True
+        self.pixels = 0
+
+    def invalidate(self):
+        self.full = True
+        self.current = []
+
+    # background is a fill color, a surface the size of the screen, or None
+    # when the caller paints the whole background itself
+    def begin(self, background):
+        if not self.enabled or self.full or background is None or background != self.background:
+            self.full = True
+            if background is not None:
+                self.erase(self.surface.get_rect(), background)
+        else:
+            for rect in self.previous:
+                self.erase(rect, background)
+        self.background = background
+
+    def erase(self, rect, background):
+        if isinstance(background, pygame.Surface):
+            self.surface.blit(background, rect, rect)
+        else:
+            self.surface.fill(background, rect)
+
+    def mark(self, rect):
+        if self.enabled:
+            self.current.append(rect)
+        return rect
+
+    def blit(self, source, dest, area=None):
+        return self.mark(self.surface.blit(source, dest, area))
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+            self.pixels = self.surface.get_width() * self.surface.get_height()
+        else:
+            dirty = self.previous + self.current
+            pygame.display.update(dirty)
+            self.pixels = sum(r.width * r.height for r in dirty)
+        self.previous = self.current
+        self.current = []
+        self.full = False
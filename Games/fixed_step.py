@@ -0,0 +1,61 @@
+import os
+import time
+
+STEP_RATE = 60  # simulation steps per second
+MAX_STEPS = 8  # most steps run in one rendered frame while catching up
+MAX_BACKLOG = 0.25  # seconds of lag kept after a hitch; anything older is dropped
+
+# Render frame cap. Interpolation keeps frames above STEP_RATE smooth up to
+# high-refresh displays; GAMES_MAX_FPS=0 renders as fast as the hardware allows.
+RENDER_FPS = int(os.environ.get("GAMES_MAX_FPS", "240"))
+
+
+# Fixed-timestep accumulator. Each rendered frame asks steps() how many
+# simulation steps are due, runs them, then draws with alpha, the fraction of
+# a step that has elapsed since the last one, to interpolate positions.
+class FixedTimestep:
+    def __init__(self, rate=STEP_RATE, max_steps=MAX_STEPS, clock=time.perf_counter):
+        self.dt = 1.0 / rate
+        self.max_steps = max_steps
+        self.clock = clock
+        self.reset()
+
+    # Forget elapsed time, e.g. after a pause or a blocking screen
+    def reset(self):
+        self.last = None
+        self.accumulator = 0.0
+
+    def steps(self):
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+            return 1
+        self.accumulator = min(self.accumulator + now - self.last, MAX_BACKLOG)
+        self.last = now
+        count = min(int(self.accumulator / self.dt), self.max_steps)
+        self.accumulator -= count * self.dt
+        return count
+
+    @property
+    def alpha(self):
+        return min(self.accumulator / self.dt, 1.0)
+
+
+# Simulation time. It advances by exactly one step per update, so anything
+# timed against it (blinks, effects, cooldowns) replays identically no matter
+# how fast frames are drawn or whether the game is paused.
+class GameClock:
+    def __init__(self, rate=STEP_RATE):
+        self.dt = 1.0 / rate
+        self.frame = 0
+
+    def tick(self):
+        self.frame += 1
+
+    @property
+    def time(self):
+        return self.frame * self.dt
+
+
+def lerp(a, b, alpha):
+    return a + (b - a) * alpha
@@ -1,73 +1,77 @@
 import pygame
-import os
-import sys
-import subprocess
+
+from text_cache import get_font, render_text
+from scenes import SceneManager
+from static_screens import EXPOSE_EVENTS, show, wait_events
 
 # Setup
 pygame.init()
 WIDTH, HEIGHT = 600, 400
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Game Hub")
+screen = None
 
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 GRAY = (40, 40, 40)
 BLUE = (0, 120, 255)
-font = pygame.font.SysFont("Arial", 28)
-small_font = pygame.font.SysFont("Arial", 20)
-
-clock = pygame.time.Clock()
-FPS = 60
+font = get_font("Arial", 28)
+small_font = get_font("Arial", 20)
 
 # Game list
 games = [
-    {"title": "Tower Jump", "file": "tower_jump_with_menu.py"},
-    {"title": "Ship vs Monster", "file": "ship_vs_monster.py"}
+    {"title": "Tower Jump", "scene": "tower_jump_menu"},
+    {"title": "Ship vs Monster", "scene": "ship_vs_monster"}
 ]
 
-def draw_menu(selected_index):
+def draw_menu(screen, selected_index):
     screen.fill(GRAY)
-    title = font.render("🎮 Select a Game", True, WHITE)
+    title = render_text(font, "🎮 Select a Game", WHITE)
     screen.blit(title, (WIDTH//2 - title.get_width()//2, 40))
 
     for i, game in enumerate(games):
         color = BLUE if i == selected_index else WHITE
-        txt = small_font.render(game["title"], True, color)
+        txt = render_text(small_font, game["title"], color)
         screen.blit(txt, (WIDTH//2 - txt.get_width()//2, 120 + i*40))
 
-    tip = small_font.render("↑ ↓ to Move | ENTER to Play | ESC to Quit", True, WHITE)
+    tip = render_text(small_font, "↑ ↓ to Move | ENTER to Play | ESC to Quit", WHITE)
     screen.blit(tip, (WIDTH//2 - tip.get_width()//2, HEIGHT - 40))
 
-    pygame.display.flip()
+selected = 0
 
-def launch_game(game_file):
-    if os.path.exists(game_file):
-        subprocess.run([sys.executable, game_file])
-    else:
-        print(f"[ERROR] File not found: {game_file}")
+# Hub scene: returns the scene of the picked game, which the scene manager
+# opens in the same window before coming back here. The menu sleeps between
+# key presses and only redraws when the selection moves.
+def run(surface):
+    global screen, selected
+    screen = surface
+    redraw = True
 
+    while True:
+        if redraw:
+            show(screen, ("hub", selected), lambda target: draw_menu(target, selected))
+            redraw = False
 
-def main():
-    selected = 0
-    running = True
-
-    while running:
-        clock.tick(FPS)
-        draw_menu(selected)
-
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.QUIT:
-                running = False
+                return None
+            elif event.type in EXPOSE_EVENTS:
+                redraw = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_DOWN:
                     selected = (selected + 1) % len(games)
+                    redraw = True
                 elif event.key == pygame.K_UP:
                     selected = (selected - 1) % len(games)
+                    redraw = True
                 elif event.key == pygame.K_RETURN:
-                    launch_game(games[selected]["file"])
+                    return games[selected]["scene"]
                 elif event.key == pygame.K_ESCAPE:
-                    running = False
+                    return None
+
 
+def main():
+    manager = SceneManager()
+    manager.register("hub", run, (WIDTH, HEIGHT), "Game Hub")
+    manager.run("hub")
     pygame.quit()
 
 if __name__ == "__main__":
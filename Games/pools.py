@@ -0,0 +1,35 @@
+# Preallocated objects handed out and taken back in O(1). Live objects are
+# kept packed at the front of `active` (a release swaps the last live object
+# into the freed spot), so iterating them never touches free slots. Pooled
+# objects need a `pool_index` attribute.
+class Pool:
+    def __init__(self, factory, capacity):
+        self.capacity = capacity
+        self.active = []
+        self.free = [factory() for _ in range(capacity)]
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(self.active)
+
+    # Returns None when every object is in use
+    def acquire(self):
+        if not self.free:
+            return None
+        obj = self.free.pop()
+        obj.pool_index = len(self.active)
+        self.active.append(obj)
+        return obj
+
+    def release(self, obj):
+        last = self.active.pop()
+        if last is not obj:
+            self.active[obj.pool_index] = last
+            last.pool_index = obj.pool_index
+        self.free.append(obj)
+
+    def clear(self):
+        while self.active:
+            self.free.append(self.active.pop())
@@ -0,0 +1,117 @@
+import atexit
+import json
+import os
+import time
+from collections import deque
+
+import pygame
+
+from text_cache import get_font
+
+# Set GAMES_PROFILE=1 to start with the timing overlay on (F3 toggles it in
+# game), and GAMES_PROFILE_LOG to a .csv or .jsonl path to stream every
+# profiled frame there
+PROFILE = os.environ.get("GAMES_PROFILE") == "1"
+PROFILE_LOG = os.environ.get("GAMES_PROFILE_LOG", "")
+PROFILE_KEY = pygame.K_F3
+
+# Phases in frame order; lap() names must come from here
+PHASES = ("wait", "events", "physics", "collision", "spawn", "update", "draw", "text", "profiler", "present")
+WINDOW = 60  # frames averaged in the overlay
+REFRESH = 15  # frames between overlay redraws
+
+
+# Per-phase frame timer. A frame is cut into laps: each lap(name) charges the
+# time since the previous lap to that phase, so instrumenting a loop is one
+# call after each phase. When disabled every call returns straight away.
+class FrameProfiler:
+    def __init__(self, enabled=PROFILE or bool(PROFILE_LOG), log_path=PROFILE_LOG):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.log = None
+        self.frame = 0
+        self.last = 0.0
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.history = {name: deque(maxlen=WINDOW) for name in PHASES + ("total",)}
+        self.overlay = []
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.start_frame()
+
+    # Handles the profiler hotkey; returns True if the event was consumed
+    def handle(self, event):
+        if event.type == pygame.KEYDOWN and event.key == PROFILE_KEY:
+            self.toggle()
+            return True
+        return False
+
+    def start_frame(self):
+        if not self.enabled:
+            return
+        self.last = time.perf_counter()
+        current = self.current
+        for name in current:
+            current[name] = 0.0
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[name] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.frame += 1
+        current = self.current
+        total = 0.0
+        for name, seconds in current.items():
+            self.history[name].append(seconds)
+            total += seconds
+        self.history["total"].append(total)
+        if self.log_path:
+            self.write(current, total)
+
+    def write(self, current, total):
+        if self.log is None:
+            self.log = open(self.log_path, "a")
+            if self.log_path.endswith(".csv") and self.log.tell() == 0:
+                self.log.write(",".join(("frame",) + PHASES + ("total",)) + "\n")
+        if self.log_path.endswith(".csv"):
+            cells = [f"{current[name] * 1000:.4f}" for name in PHASES]
+            self.log.write(f"{self.frame}," + ",".join(cells) + f",{total * 1000:.4f}\n")
+        else:
+            row = {name: round(seconds * 1000, 4) for name, seconds in current.items()}
+            row["frame"], row["total"] = self.frame, round(total * 1000, 4)
+            self.log.write(json.dumps(row) + "\n")
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    # Rolling average and worst time per phase, drawn with blit(surface, pos)
+    # so callers can route it through their renderer. The numbers change
+    # every frame, so they are rendered directly rather than through the text
+    # cache, and only every REFRESH frames.
+    def draw(self, blit, x=10, y=100):
+        if not self.enabled:
+            return
+        if self.frame % REFRESH == 0 or not self.overlay:
+            font = get_font("Consolas", 14)
+            self.overlay = []
+            for name, samples in self.history.items():
+                if not samples or (name != "total" and not max(samples)):
+                    continue
+                avg = sum(samples) / len(samples) * 1000
+                text = f"{name:<9} {avg:6.2f} ms  max {max(samples) * 1000:6.2f}"
+                self.overlay.append(font.render(text, True, (255, 255, 0), (0, 0, 0)))
+        for line in self.overlay:
+            blit(line, (x, y))
+            y += line.get_height()
+
+
+profiler = FrameProfiler()
+atexit.register(profiler.close)
@@ -0,0 +1,386 @@
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+from fixed_step import STEP_RATE
+
+# Set GAMES_SEED to replay the same layouts and monster behaviour every run,
+# and GAMES_RECORD to a directory to save each session's inputs there, as
+# binary replays with keyframes or, with GAMES_RECORD_FORMAT=text, as text
+SEED = os.environ.get("GAMES_SEED")
+RECORD_DIR = os.environ.get("GAMES_RECORD", "")
+RECORD_FORMAT = os.environ.get("GAMES_RECORD_FORMAT", "binary")
+KEYFRAME_STEPS = 2 * STEP_RATE  # steps between keyframes in binary replays
+
+
+def session_seed():
+    return int(SEED) if SEED else random.randrange(2 ** 32)
+
+
+# random.Random that counts the 32-bit words it draws, so its whole state is
+# the seed plus that count: restore() reseeds and draws the words again, which
+# takes about a millisecond per hour of Ship vs Monster, where a saved
+# Mersenne Twister state is 2.5 KB that doesn't compress. Every method draws
+# through random() or getrandbits() except gauss(), whose cached second value
+# isn't counted; none of the games use it.
+class SeededRandom(random.Random):
+    SKIP_WORDS = 1 << 14  # words drawn per getrandbits() call when restoring
+
+    def __init__(self, seed=None):
+        self.words = 0
+        super().__init__(seed)
+
+    def seed(self, a=None, version=2):
+        super().seed(a, version)
+        self.origin = a
+        self.words = 0
+
+    def random(self):
+        self.words += 2
+        return super().random()
+
+    def getrandbits(self, k):
+        self.words += (k - 1) // 32 + 1 if k else 0
+        return super().getrandbits(k)
+
+    def restore(self, words):
+        self.seed(self.origin)
+        self.words = words
+        while words:
+            n = min(words, self.SKIP_WORDS)
+            super().getrandbits(32 * n)
+            words -= n
+
+
+# Writes one session's per-step inputs: a JSON header line, then one
+# "inputs count" line per run of identical steps, and a "# {summary}" trailer
+# with the final state so a replay can check it ended up in the same place.
+# Without a directory, or once closed, it records nothing.
+class Recorder:
+    def __init__(self, game, seed, directory=RECORD_DIR, **meta):
+        self.file = None
+        self.last = None
+        self.run = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, f"{game}-{seed}-{int(time.time())}.rec")
+            self.file = open(self.path, "w")
+            self.file.write(json.dumps({"game": game, "seed": seed, "step_rate": STEP_RATE, **meta}) + "\n")
+
+    def record(self, inputs):
+        if self.file is None:
+            return
+        if inputs == self.last:
+            self.run += 1
+            return
+        if self.run:
+            self.file.write(f"{self.last} {self.run}\n")
+        self.last, self.run = inputs, 1
+
+    def close(self, summary=None):
+        if self.file is None:
+            return
+        if self.run:
+            self.file.write(f"{self.last} {self.run}\n")
+        if summary is not None:
+            self.file.write("# " + json.dumps(summary) + "\n")
+        self.file.close()
+        self.file = None
+
+
+# Binary replay: a FILE_HEAD and JSON header, then one block per
+# KEYFRAME_STEPS steps holding the full state before its first step (as the
+# game's keyframe() returns it) and that many steps' inputs packed `bits` to a
+# step, each block zlib-compressed when the ZLIB flag is set. The summary
+# trailer, a block index and a FILE_TAIL pointing at them come last, so a
+# reader maps the file, reads the tail and can go straight to any block.
+MAGIC = b"GRPL"
+VERSION = 1
+ZLIB = 1
+FILE_HEAD = struct.Struct("<4sBBxxI")  # magic, version, flags, JSON header length
+KEYFRAME_SIZE = struct.Struct("<I")  # at the start of each block
+BLOCK = struct.Struct("<QI")  # index entry: offset, stored length
+FILE_TAIL = struct.Struct("<QIII4s")  # index offset, blocks, steps, summary length, magic
+
+
+def pack_inputs(inputs, bits):
+    value = 0
+    for i, mask in enumerate(inputs):
+        value |= mask << (bits * i)
+    return value.to_bytes((bits * len(inputs) + 7) // 8, "little")
+
+
+def unpack_inputs(data, bits, count):
+    value = int.from_bytes(data, "little")
+    mask = (1 << bits) - 1
+    return [value >> (bits * i) & mask for i in range(count)]
+
+
+# Writes a binary replay. keyframe() is called for the simulation's state
+# every interval steps, before the step whose input is being recorded; bits is
+# how many bits each step's inputs take.
+class KeyframeRecorder:
+    def __init__(self, game, seed, keyframe, bits, directory=RECORD_DIR, interval=KEYFRAME_STEPS, compress=True,
+                 **meta):
+        self.file = None
+        self.keyframe = keyframe
+        self.bits = bits
+        self.interval = interval
+        self.compress = compress
+        self.steps = 0
+        self.block = None
+        self.inputs = []
+        self.index = []
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, f"{game}-{seed}-{int(time.time())}.rpl")
+            self.file = open(self.path, "wb")
+            header = json.dumps({"game": game, "seed": seed, "step_rate": STEP_RATE, "interval": interval,
+                                 "bits": bits, **meta}).encode()
+            self.file.write(FILE_HEAD.pack(MAGIC, VERSION, ZLIB if compress else 0, len(header)) + header)
+
+    def record(self, inputs):
+        if self.file is None:
+            return
+        if self.steps % self.interval == 0:
+            self.flush()
+            self.block = self.keyframe()
+        self.inputs.append(inputs)
+        self.steps += 1
+
+    def flush(self):
+        if self.block is None:
+            return
+        data = KEYFRAME_SIZE.pack(len(self.block)) + self.block + pack_inputs(self.inputs, self.bits)
+        if self.compress:
+            data = zlib.compress(data)
+        self.index.append((self.file.tell(), len(data)))
+        self.file.write(data)
+        self.block, self.inputs = None, []
+
+    def close(self, summary=None):
+        if self.file is None:
+            return
+        self.flush()
+        trailer = json.dumps(summary).encode()
+        self.file.write(trailer)
+        index_at = self.file.tell()
+        self.file.write(b"".join(BLOCK.pack(*entry) for entry in self.index))
+        self.file.write(FILE_TAIL.pack(index_at, len(self.index), self.steps, len(trailer), MAGIC))
+        self.file.close()
+        self.file = None
+
+
+# The recorder GAMES_RECORD_FORMAT asks for. Text recordings ignore keyframe and bits.
+def open_recorder(game, seed, keyframe, bits, **meta):
+    if RECORD_FORMAT == "text":
+        return Recorder(game, seed, **meta)
+    return KeyframeRecorder(game, seed, keyframe, bits, **meta)
+
+
+# A binary replay opened for reading. The file is memory-mapped and only the
+# header, summary and block index are parsed up front; seek() decompresses
+# one block, restores its keyframe and steps forward from there, reusing one
+# simulation for every seek.
+class ReplayFile:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, length = FILE_HEAD.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} binary replay")
+        self.header = json.loads(self.data[FILE_HEAD.size:FILE_HEAD.size + length])
+        index_at, blocks, self.steps, trailer, magic = FILE_TAIL.unpack_from(self.data, len(self.data) - FILE_TAIL.size)
+        if magic != MAGIC:
+            raise ValueError(f"{path} was not closed; its recording was cut short")
+        self.summary = json.loads(self.data[index_at - trailer:index_at])
+        self.index = list(BLOCK.iter_unpack(self.data[index_at:index_at + blocks * BLOCK.size]))
+        self.compressed = flags & ZLIB
+        self.interval = self.header["interval"]
+        self.bits = self.header["bits"]
+        self.simulation = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+
+    # Keyframe and inputs of block b
+    def block(self, b):
+        offset, length = self.index[b]
+        data = self.data[offset:offset + length]
+        if self.compressed:
+            data = zlib.decompress(data)
+        size, = KEYFRAME_SIZE.unpack_from(data)
+        start = KEYFRAME_SIZE.size + size
+        count = min(self.interval, self.steps - b * self.interval)
+        return data[KEYFRAME_SIZE.size:start], unpack_inputs(data[start:], self.bits, count)
+
+    def inputs(self):
+        inputs = []
+        for b in range(len(self.index)):
+            inputs += self.block(b)[1]
+        return inputs
+
+    # The simulation as it was after `step` steps (clamped to the recording)
+    def seek(self, step):
+        step = max(0, min(step, self.steps))
+        if self.simulation is None:
+            self.simulation = new_simulation(self.header)
+        sim, advance = self.simulation
+        if self.index:
+            b = min(step // self.interval, len(self.index) - 1)
+            keyframe, inputs = self.block(b)
+            sim.restore(keyframe)
+            for mask in inputs[:step - b * self.interval]:
+                advance(mask)
+        return sim
+
+
+def is_binary(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load(path):
+    if is_binary(path):
+        with ReplayFile(path) as replay_file:
+            return replay_file.header, replay_file.inputs(), replay_file.summary
+    inputs = []
+    summary = None
+    with open(path) as f:
+        header = json.loads(f.readline())
+        for line in f:
+            if line.startswith("#"):
+                summary = json.loads(line[1:])
+                continue
+            value, count = line.split()
+            inputs.extend([int(value)] * int(count))
+    return header, inputs, summary
+
+
+# Headless versions of each game's simulation, built from a recording's
+# header: the simulation (whose summary() is what the game recorded) and a
+# function that steps it with one recorded input
+
+def tower_jump_simulation(seed):
+    from tower_engine import TowerEngine
+    engine = TowerEngine(rng=SeededRandom(seed))
+    return engine, engine.step
+
+
+# Recordings from before split screen went beyond two players have no
+# players or field in their header
+def tower_jump_2p_simulation(seed, players=2, field=(400, 600)):
+    from tower_engine import TowerBatch
+    batch = TowerBatch(players, *field)
+    batch.reset(seed)
+    shifts = [2 * i for i in range(players)]
+    return batch, lambda mask: batch.step([mask >> shift & 3 for shift in shifts])
+
+
+def ship_vs_monster_simulation(seed):
+    from ship_vs_monster import Session
+    session = Session(seed)
+
+    def step(mask):
+        session.update(mask)
+        session.boss_intro_pending = False
+
+    return session, step
+
+
+SIMULATIONS = {
+    "tower_jump": tower_jump_simulation,
+    "tower_jump_2p": tower_jump_2p_simulation,
+    "ship_vs_monster": ship_vs_monster_simulation,
+}
+FORMAT_KEYS = ("game", "seed", "step_rate", "interval", "bits")  # header fields that aren't game settings
+
+
+def new_simulation(header):
+    meta = {key: value for key, value in header.items() if key not in FORMAT_KEYS}
+    return SIMULATIONS[header["game"]](header["seed"], **meta)
+
+
+def replay(path):
+    header, inputs, expected = load(path)
+    start = time.perf_counter()
+    sim, step = new_simulation(header)
+    for mask in inputs:
+        step(mask)
+    summary = sim.summary()
+    elapsed = time.perf_counter() - start
+    return {
+        "game": header["game"],
+        "seed": header["seed"],
+        "steps": len(inputs),
+        "seconds": elapsed,
+        "speedup": len(inputs) / header["step_rate"] / elapsed if elapsed else float("inf"),
+        "match": None if expected is None else summary == expected,
+        "summary": summary,
+    }
+
+
+# Re-records a replay in the binary format, keyframes included
+def convert(path, directory, compress=True):
+    header, inputs, expected = load(path)
+    sim, step = new_simulation(header)
+    meta = {key: value for key, value in header.items() if key not in FORMAT_KEYS}
+    bits = max(max(inputs, default=0).bit_length(), 1)
+    recorder = KeyframeRecorder(header["game"], header["seed"], sim.keyframe, bits, directory,
+                                compress=compress, **meta)
+    for mask in inputs:
+        recorder.record(mask)
+        step(mask)
+    recorder.close(sim.summary() if expected is not None else None)
+    return recorder.path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run recorded sessions and check where they end up")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--seek", type=int, nargs="*", help="show the state after these steps of binary replays")
+    parser.add_argument("--convert", metavar="DIR", help="write binary copies of the recordings here")
+    parser.add_argument("--no-zlib", action="store_true", help="leave converted replays uncompressed")
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.paths:
+        if args.convert:
+            print(f"{path} -> {convert(path, args.convert, not args.no_zlib)}")
+        elif args.seek is not None and not is_binary(path):
+            print(f"{path}: text recording, convert it with --convert to seek")
+            failed = True
+        elif args.seek is not None:
+            start = time.perf_counter()
+            with ReplayFile(path) as replay_file:
+                opened = time.perf_counter()
+                print(f"{path}: {replay_file.header['game']} seed {replay_file.header['seed']}, "
+                      f"{replay_file.steps} steps, opened in {(opened - start) * 1000:.2f} ms")
+                for step in args.seek:
+                    start = time.perf_counter()
+                    summary = replay_file.seek(step).summary()
+                    print(f"  step {step}: {json.dumps(summary)} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+        else:
+            result = replay(path)
+            status = {None: "no summary", True: "match", False: "MISMATCH"}[result["match"]]
+            print(f"{path}: {result['game']} seed {result['seed']}, {result['steps']} steps in "
+                  f"{result['seconds']:.3f}s ({result['speedup']:.0f}x real time), {status}")
+            failed = failed or result["match"] is False
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    sys.exit(main())
@@ -0,0 +1,55 @@
+import importlib
+
+import pygame
+
+# Returned by a scene to go back to the scene that opened it
+BACK = "back"
+
+# Scenes the hub can open: name -> (module, window caption). Each module has a
+# run(surface) function and WIDTH/HEIGHT for its window size.
+SCENES = {
+    "hub": ("main_menu", "Game Hub"),
+    "tower_jump_menu": ("tower_jump_with_menu", "Tower Jump - Main Menu"),
+    "tower_jump_1p": ("tower_jump_1player", "Tower Jump"),
+    "tower_jump_2p": ("tower_jump_2player", "Tower Jump - Two Player"),
+    "ship_vs_monster": ("ship_vs_monster", "Ship vs Monster"),
+}
+
+
+# Runs every game in one process on one shared display. A scene's run(surface)
+# returns the name of the next scene to open, BACK, or None to quit. Game
+# modules are imported the first time they are opened and stay loaded, so
+# their fonts, surfaces and text caches are reused on every later visit.
+class SceneManager:
+    def __init__(self):
+        self.scenes = {}
+        self.screen = None
+
+    def register(self, name, run, size, caption):
+        self.scenes[name] = (run, size, caption)
+
+    def get(self, name):
+        if name not in self.scenes:
+            module_name, caption = SCENES[name]
+            module = importlib.import_module(module_name)
+            self.register(name, module.run, (module.WIDTH, module.HEIGHT), caption)
+        return self.scenes[name]
+
+    def show(self, name):
+        run, size, caption = self.get(name)
+        if self.screen is None or self.screen.get_size() != size:
+            self.screen = pygame.display.set_mode(size)
+        pygame.display.set_caption(caption)
+        pygame.event.clear()
+        return run(self.screen)
+
+    def run(self, name):
+        stack = [name]
+        while stack:
+            result = self.show(stack[-1])
+            if result is None:
+                break
+            if result == BACK:
+                stack.pop()
+            else:
+                stack.append(result)
@@ -0,0 +1,38 @@
+import heapq
+import itertools
+
+
+# Callbacks due at a point on a game clock (a step count, or seconds for a
+# wall clock), kept in a heap so each run() only looks at the earliest entry.
+# Scheduling and firing cost O(log n) however many timers are pending, and
+# nothing is checked on frames where no timer is due. Entries due at the same
+# time fire in the order they were scheduled, so runs stay deterministic.
+class Scheduler:
+    def __init__(self):
+        self.heap = []
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    # Returns a handle for cancel()
+    def call_at(self, when, callback, *args):
+        entry = [when, next(self.counter), callback, args]
+        heapq.heappush(self.heap, entry)
+        return entry
+
+    # Cancelled entries stay in the heap and are skipped when they come due
+    def cancel(self, entry):
+        entry[2] = None
+
+    # Fires everything due at or before now, including anything a callback
+    # schedules for now or earlier
+    def run(self, now):
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            _, _, callback, args = heapq.heappop(heap)
+            if callback is not None:
+                callback(*args)
+
+    def clear(self):
+        self.heap.clear()
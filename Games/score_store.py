@@ -0,0 +1,101 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+
+DB_FILE = "scores.db"
+
+# Plain-text high scores from before the store existed, imported once into a
+# fresh database. Tower Jump and Ship vs Monster both used highscore.txt, so
+# its value seeds both games.
+LEGACY_FILES = {
+    ("tower_jump", "default"): "highscore.txt",
+    ("ship_vs_monster", "default"): "highscore.txt",
+    ("tower_jump_2p", "Player 1"): "highscore_player1.txt",
+    ("tower_jump_2p", "Player 2"): "highscore_player2.txt",
+}
+
+
+# High scores namespaced by game and player. Reads come from an in-memory
+# copy; writes are queued to a background thread that commits each one in
+# its own SQLite transaction, so a frame loop never waits on the disk.
+class ScoreStore:
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.cache = {}
+        self.queue = queue.Queue()
+
+        db = sqlite3.connect(path)
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS scores ("
+                       "game TEXT NOT NULL, player TEXT NOT NULL, score INTEGER NOT NULL, "
+                       "PRIMARY KEY (game, player))")
+            rows = db.execute("SELECT game, player, score FROM scores").fetchall()
+            if not rows:
+                rows = self.read_legacy_files()
+                db.executemany("INSERT INTO scores VALUES (?, ?, ?)", rows)
+        db.close()
+        for game, player, score in rows:
+            self.cache[(game, player)] = score
+
+        self.writer = threading.Thread(target=self.write_loop, daemon=True)
+        self.writer.start()
+
+    def read_legacy_files(self):
+        rows = []
+        for (game, player), name in LEGACY_FILES.items():
+            path = os.path.join(os.path.dirname(self.path), name)
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    try:
+                        rows.append((game, player, int(f.read())))
+                    except ValueError:
+                        pass
+        return rows
+
+    def get(self, game, player="default"):
+        return self.cache.get((game, player), 0)
+
+    def best(self, game):
+        return max([s for (g, _), s in self.cache.items() if g == game], default=0)
+
+    # Record a finished game; returns True if it is a new high score
+    def submit(self, game, score, player="default"):
+        if score <= self.get(game, player):
+            return False
+        self.cache[(game, player)] = score
+        self.queue.put((game, player, score))
+        return True
+
+    def flush(self):
+        self.queue.join()
+
+    def close(self):
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+
+    def write_loop(self):
+        db = sqlite3.connect(self.path)
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            with db:
+                db.execute("INSERT INTO scores VALUES (?, ?, ?) "
+                           "ON CONFLICT (game, player) DO UPDATE SET score = max(score, excluded.score)", item)
+            self.queue.task_done()
+        db.close()
+
+
+store = None
+
+
+def get_store():
+    global store
+    if store is None:
+        store = ScoreStore()
+        atexit.register(store.close)
+    return store
@@ -0,0 +1,249 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import ship_vs_monster as game
+from bench_frames import percentile
+from fixed_step import STEP_RATE
+
+# Monte Carlo balance runs: thousands of headless Sessions, each from its own
+# seed and played by a scripted policy, spread over a process pool. Sessions
+# share nothing, so throughput grows with the number of cores. Reports how
+# long players survive, how long each level's monster takes to kill and what
+# each power-up is worth, as text or JSON.
+SESSIONS = 10000
+MAX_MINUTES = 3
+SURVIVAL_STEP = 15  # seconds between points on the survival curve
+SETTLE_LEVEL = 4  # power-ups are compared among sessions that got this far
+
+
+# Fires every fire_every steps, stays under the monster, goes for falling
+# power-ups and sidesteps monster bullets that are about to land on the ship
+def dodge_policy(session, fire_every=6):
+    player, monster = session.player.rect, session.monster
+    inputs = game.SHOOT if session.clock.frame % fire_every == 0 else 0
+
+    bullets = monster.bullets
+    n = bullets.count
+    if n:
+        x, y = bullets.x[:n], bullets.y[:n]
+        lookahead = monster.bullet_speed * 25
+        threat = (y < player.bottom) & (y > player.top - lookahead) & \
+                 (x > player.left - 20) & (x < player.right + 20)
+        if threat.any():
+            if x[threat].mean() > player.centerx:
+                return inputs | (game.LEFT if player.left > 60 else game.RIGHT)
+            return inputs | (game.RIGHT if player.right < game.WIDTH - 60 else game.LEFT)
+
+    powerup = session.powerup
+    target = powerup.rect.centerx if powerup else monster.rect.centerx
+    if target < player.centerx - 10: inputs |= game.LEFT
+    if target > player.centerx + 10: inputs |= game.RIGHT
+    return inputs
+
+
+# Same aim and fire rate, but never dodges; a baseline for how much of the
+# survival time comes from moving out of the way
+def track_policy(session, fire_every=6):
+    inputs = game.SHOOT if session.clock.frame % fire_every == 0 else 0
+    dx = session.monster.rect.centerx - session.player.rect.centerx
+    if dx < -10: inputs |= game.LEFT
+    if dx > 10: inputs |= game.RIGHT
+    return inputs
+
+
+POLICIES = {"dodge": dodge_policy, "track": track_policy}
+
+
+# One session from seed until game over or max_frames. Returns plain data so
+# it pickles cheaply back to the parent.
+def simulate(task):
+    seed, policy_name, fire_every, max_frames = task
+    policy = POLICIES[policy_name]
+    session = game.Session(seed)
+    player = session.player
+    kills, hits, powerups = [], [], []
+    spawned = 0
+    while not session.game_over and session.clock.frame < max_frames:
+        level, lives, shield = session.level, player.lives, player.shield
+        powerup = session.powerup
+        session.update(policy(session, fire_every))
+        frame = session.clock.frame
+        if session.level != level:
+            kills.append((level, frame - spawned, player.bullet_level))
+            spawned = frame
+        if player.lives < lives or (shield and not player.shield):
+            hits.append((level, frame, player.lives < lives))
+        if powerup is not None and session.powerup is not powerup and powerup.rect.colliderect(player.rect):
+            powerups.append((powerup.type, level))
+        session.boss_intro_pending = False
+    return {
+        "seed": seed,
+        "frames": session.clock.frame,
+        "died": session.game_over,
+        "level": session.level,
+        "score": session.score,
+        "kills": kills,
+        "hits": hits,
+        "powerups": powerups,
+    }
+
+
+def survival_curve(results, max_frames):
+    curve = []
+    for second in range(0, max_frames // STEP_RATE + 1, SURVIVAL_STEP):
+        alive = sum(not r["died"] or r["frames"] > second * STEP_RATE for r in results)
+        curve.append((second, alive / len(results)))
+    return curve
+
+
+def level_reached(results):
+    top = max(r["level"] for r in results)
+    return [(level, sum(r["level"] >= level for r in results) / len(results)) for level in range(1, top + 1)]
+
+
+def time_to_kill(results):
+    by_level, by_bullets = {}, {}
+    for r in results:
+        for level, frames, bullet_level in r["kills"]:
+            by_level.setdefault(level, []).append(frames / STEP_RATE)
+            by_bullets.setdefault((level, bullet_level), []).append(frames / STEP_RATE)
+    table = {}
+    for level, times in sorted(by_level.items()):
+        times.sort()
+        table[level] = {
+            "kills": len(times),
+            "median_s": statistics.median(times),
+            "p90_s": percentile(times, 90),
+            "by_bullet_level": {b: statistics.median(t) for (l, b), t in sorted(by_bullets.items()) if l == level},
+        }
+    return table
+
+
+# Compares sessions that picked up each power-up type before SETTLE_LEVEL with
+# those that didn't, among the sessions that reached SETTLE_LEVEL at all, so
+# dying early doesn't count against the power-ups nobody had time to collect
+def powerup_impact(results):
+    settled = [r for r in results if r["level"] >= SETTLE_LEVEL]
+    impact = {}
+    for kind in ("shield", "double", "speed"):
+        groups = {True: [], False: []}
+        for r in settled:
+            groups[any(t == kind and level < SETTLE_LEVEL for t, level in r["powerups"])].append(r)
+        row = {"collected_rate": len(groups[True]) / len(settled) if settled else 0.0}
+        for key, group in (("with", groups[True]), ("without", groups[False])):
+            row[key] = {
+                "sessions": len(group),
+                "mean_level": statistics.mean(r["level"] for r in group) if group else None,
+                "death_rate": sum(r["died"] for r in group) / len(group) if group else None,
+            }
+        impact[kind] = row
+    impact["shield"]["hits_absorbed"] = sum(not lost for r in results for _, _, lost in r["hits"])
+    return impact
+
+
+def report(results, max_frames):
+    frames = [r["frames"] for r in results]
+    return {
+        "sessions": len(results),
+        "died": sum(r["died"] for r in results),
+        "mean_minutes": statistics.mean(frames) / STEP_RATE / 60,
+        "mean_level": statistics.mean(r["level"] for r in results),
+        "survival": survival_curve(results, max_frames),
+        "level_reached": level_reached(results),
+        "time_to_kill": time_to_kill(results),
+        "powerups": powerup_impact(results),
+    }
+
+
+def print_report(summary, meta):
+    print(f"{summary['sessions']} sessions ({meta['policy']} policy, fire every {meta['fire_every']} steps) "
+          f"in {meta['seconds']:.1f}s on {meta['workers']} workers: "
+          f"{summary['sessions'] / meta['seconds']:.0f} sessions/s, {meta['steps'] / meta['seconds']:.0f} steps/s")
+    print(f"{summary['died']} died within {meta['max_minutes']} min; "
+          f"mean {summary['mean_minutes']:.2f} min, mean level {summary['mean_level']:.2f}")
+
+    print("\nsurvival      alive")
+    for second, alive in summary["survival"]:
+        print(f"  {second:4d}s    {alive:7.1%}")
+
+    print("\nlevel  reached  kills  ttk median  ttk p90  median by bullet level")
+    ttk = summary["time_to_kill"]
+    for level, reached in summary["level_reached"]:
+        row = ttk.get(level)
+        if row is None:
+            print(f"  {level:3d}  {reached:7.1%}")
+            continue
+        bullets = "  ".join(f"{b}x {t:.1f}s" for b, t in row["by_bullet_level"].items())
+        print(f"  {level:3d}  {reached:7.1%}  {row['kills']:5d}  {row['median_s']:9.1f}s  {row['p90_s']:6.1f}s  {bullets}")
+
+    print(f"\npower-up  picked up   (sessions reaching level {SETTLE_LEVEL}, by pickups before it)")
+    for kind, row in summary["powerups"].items():
+        cells = []
+        for key in ("with", "without"):
+            group = row[key]
+            if group["sessions"]:
+                cells.append(f"{key} {group['sessions']}: level {group['mean_level']:.2f}, "
+                             f"died {group['death_rate']:.0%}")
+        print(f"  {kind:<7} {row['collected_rate']:7.1%}   " + "; ".join(cells))
+    print(f"  shields absorbed {summary['powerups']['shield']['hits_absorbed']} hits")
+
+
+# Pool worker start-up. Importing ship_vs_monster runs pygame.init(), and SDL
+# then ignores SIGTERM, so put the default back for the pool to stop workers.
+def reset_sigterm():
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance analysis for Ship vs Monster")
+    parser.add_argument("--sessions", type=int, default=SESSIONS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--minutes", type=float, default=MAX_MINUTES, help="game time cap per session")
+    parser.add_argument("--policy", choices=list(POLICIES), default="dodge")
+    parser.add_argument("--fire-every", type=int, default=6, help="steps between shots")
+    parser.add_argument("--seed", type=int, default=0, help="first session seed")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    max_frames = int(args.minutes * 60 * STEP_RATE)
+    tasks = [(args.seed + i, args.policy, args.fire_every, max_frames) for i in range(args.sessions)]
+    chunksize = max(1, len(tasks) // (args.workers * 16))
+    start = time.perf_counter()
+    if args.workers > 1:
+        # spawn rather than fork: a forked copy of an initialised SDL can hang
+        with multiprocessing.get_context("spawn").Pool(args.workers, initializer=reset_sigterm) as pool:
+            results = list(pool.imap_unordered(simulate, tasks, chunksize))
+            # let the workers finish instead of leaving it to terminate() on exit
+            pool.close()
+            pool.join()
+    else:
+        results = [simulate(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda r: r["seed"])
+
+    meta = {
+        "policy": args.policy,
+        "fire_every": args.fire_every,
+        "workers": args.workers,
+        "seconds": elapsed,
+        "steps": sum(r["frames"] for r in results),
+        "max_minutes": args.minutes,
+        "first_seed": args.seed,
+    }
+    summary = report(results, max_frames)
+    if args.json:
+        print(json.dumps({"meta": meta, "report": summary}, indent=2))
+    else:
+        print_report(summary, meta)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
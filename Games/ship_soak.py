@@ -0,0 +1,119 @@
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("GAMES_MAX_FPS", "0")  # the fake clock runs every frame at full speed
+
+import pygame
+
+import score_store
+import ship_vs_monster as game
+from dirty_rects import DirtyRenderer
+from fixed_step import MAX_STEPS, STEP_RATE
+
+# Restart soak for Ship vs Monster: drives the real state machine through
+# title -> playing -> game over -> restart over and over, on a fake clock that
+# runs every frame at full catch-up speed and with one-life ships so each
+# playthrough ends quickly, and checks that memory and stack depth stay flat.
+# Exits non-zero if traced memory grew by more than --limit KiB after the
+# warm-up restarts.
+CYCLES = 2000
+WARMUP = 50
+LIMIT_KIB = 256
+
+
+def stack_depth():
+    depth = 0
+    frame = sys._getframe(1)
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+def post_key(key):
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+
+
+# Plays itself: answers the title and game-over screens by posting the key
+# they wait for, and stops after `cycles` playthroughs
+class SoakGame(game.Game):
+    def __init__(self, cycles, report_every):
+        self.now = 0.0
+        super().__init__(clock=self.tick)
+        self.cycles = cycles
+        self.report_every = report_every
+        self.played = 0
+        self.depths = set()
+        self.samples = []
+
+    def tick(self):
+        self.now += MAX_STEPS / STEP_RATE
+        return self.now
+
+    def start_session(self):
+        super().start_session()
+        self.session.player.lives = 1
+        self.session.score = self.played + 1  # a new best every game over, so each one writes to the store
+
+    def title(self):
+        if self.played == self.cycles:
+            return None
+        post_key(pygame.K_RETURN)
+        return super().title()
+
+    def game_over(self):
+        self.played += 1
+        self.depths.add(stack_depth())
+        if self.played == WARMUP or self.played % self.report_every == 0:
+            gc.collect()
+            current = tracemalloc.get_traced_memory()[0]
+            self.samples.append((self.played, current))
+            print(f"{self.played:6d} restarts  traced {current / 1024:8.1f} KiB  "
+                  f"explosions {len(game.explosions.active)}", file=sys.stderr)
+        post_key(pygame.K_r)
+        return super().game_over()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Restart soak test for Ship vs Monster")
+    parser.add_argument("--cycles", type=int, default=CYCLES)
+    parser.add_argument("--limit", type=float, default=LIMIT_KIB, help="allowed growth in KiB after warm-up")
+    args = parser.parse_args()
+
+    surface = pygame.display.set_mode((game.WIDTH, game.HEIGHT))
+    game.win = surface
+    game.renderer = DirtyRenderer(surface)
+    # A real database file, kept off the real table: every ":memory:"
+    # connection is its own empty database, so the writer thread's would
+    # have no scores table
+    with tempfile.TemporaryDirectory() as directory:
+        store = score_store.store = score_store.ScoreStore(os.path.join(directory, "scores.db"))
+        tracemalloc.start()
+        soak = SoakGame(max(args.cycles, WARMUP), max(args.cycles // 20, 1))
+        soak.run()
+        tracemalloc.stop()
+        store.flush()
+        writing = store.writer.is_alive()
+        store.close()
+        best = score_store.ScoreStore(store.path)  # read back what the writer committed
+        saved = best.get("ship_vs_monster")
+        best.close()
+        score_store.store = None
+
+    baseline = next(current for played, current in soak.samples if played >= WARMUP)
+    growth = (soak.samples[-1][1] - baseline) / 1024
+    print(f"{soak.played} restarts, stack depth {sorted(soak.depths)}, "
+          f"memory growth after warm-up {growth:+.1f} KiB (limit {args.limit:.0f}), "
+          f"best score saved {saved}, score writer {'running' if writing else 'DIED'}")
+    if len(soak.depths) > 1 or growth > args.limit or not writing or saved != soak.played:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,22 @@
 import pygame
-import random
-import sys
-import time
-import os
+import struct
+
+from text_cache import get_font, render_text
+from score_store import get_store
+from scenes import SceneManager, BACK
+from dirty_rects import DirtyRenderer
+from fixed_step import FixedTimestep, GameClock, RENDER_FPS, STEP_RATE, lerp
+from bullets import BulletSystem
+from pools import Pool
+from replay import SeededRandom, open_recorder, session_seed
+from profiler import profiler
+from static_screens import EXPOSE_EVENTS, show, wait_events
+from scheduler import Scheduler
 
 pygame.init()
 WIDTH, HEIGHT = 800, 600
-win = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Ship vs Monster")
+win = None
+renderer = None
 
 WHITE = (255, 255, 255)
 RED = (255, 0, 0)
@@ -20,6 +29,14 @@ BLACK = (0, 0, 0)
 
 clock = pygame.time.Clock()
 
+# Per-step inputs, as recorded in replays
+LEFT, RIGHT, SHOOT = 1, 2, 4
+
+# Timers in simulation steps; each lasts until the step after the full duration
+INVINCIBLE_STEPS = 2 * STEP_RATE + 1
+EXPLOSION_STEPS = int(0.3 * STEP_RATE) + 1
+BOSS_INTRO_SECONDS = 2  # wall clock, the simulation is stopped meanwhile
+
 ship_img = pygame.Surface((50, 40))
 ship_img.fill(GREEN)
 
@@ -32,50 +49,61 @@ boss_img.fill(ORANGE)
 bullet_img = pygame.Surface((5, 10))
 bullet_img.fill(WHITE)
 
+monster_bullet_img = pygame.Surface((5, 10))
+monster_bullet_img.fill(RED)
+
 bg_img = pygame.Surface((WIDTH, HEIGHT))
 bg_img.fill((20, 20, 40))
 
 explosion_img = pygame.Surface((30, 30))
 explosion_img.fill(YELLOW)
 
-explosions = []
+# Short-lived hit effects, recycled from a fixed pool
+class Explosion:
+    __slots__ = ("rect", "pool_index")
+
+    def __init__(self):
+        self.rect = explosion_img.get_rect()
+        self.pool_index = 0
+
+explosions = Pool(Explosion, 128)
 
-def draw_text(text, x, y, size=30, color=WHITE, center=False):
-    font = pygame.font.SysFont("Arial", size)
-    render = font.render(text, True, color)
+# Draws to the screen through the renderer, or onto surface when given one
+def draw_text(text, x, y, size=30, color=WHITE, center=False, surface=None):
+    render = render_text(get_font("Arial", size), text, color)
+    blit = surface.blit if surface is not None else renderer.blit
     if center:
         rect = render.get_rect(center=(x, y))
-        win.blit(render, rect)
+        blit(render, rect)
     else:
-        win.blit(render, (x, y))
+        blit(render, (x, y))
 
 def load_high_score():
-    if os.path.exists("highscore.txt"):
-        with open("highscore.txt", "r") as f:
-            return int(f.read())
-    return 0
+    return get_store().get("ship_vs_monster")
 
 def save_high_score(score):
-    with open("highscore.txt", "w") as f:
-        f.write(str(score))
+    get_store().submit("ship_vs_monster", score)
 
 class Player:
-    def __init__(self):
+    def __init__(self, clock, scheduler):
+        self.clock = clock
+        self.scheduler = scheduler
         self.rect = ship_img.get_rect(center=(WIDTH // 2, HEIGHT - 50))
-        self.bullets = []
+        self.prev_x = self.rect.x
+        self.bullets = BulletSystem(*bullet_img.get_size())
         self.bullet_speed = 10
         self.lives = 3
         self.invincible = False
-        self.invincible_start_time = 0
         self.shield = False
         self.bullet_level = 1  # 1 = normal, 2 = double, ..., max 4
         self.speed_boost = False
 
-    def move(self, keys):
+    def move(self, inputs):
+        self.prev_x = self.rect.x
         speed = 8 if self.speed_boost else 5
-        if keys[pygame.K_LEFT] and self.rect.left > 0:
+        if inputs & LEFT and self.rect.left > 0:
             self.rect.x -= speed
-        if keys[pygame.K_RIGHT] and self.rect.right < WIDTH:
+        if inputs & RIGHT and self.rect.right < WIDTH:
             self.rect.x += speed
 
     def shoot(self):
@@ -88,9 +116,8 @@ class Player:
         else:
             offsets = [-20, -7, 7, 20]
 
-        for offset in offsets:
-            bullet = bullet_img.get_rect(midbottom=(self.rect.centerx + offset, self.rect.top))
-            self.bullets.append(bullet)
+        self.bullets.spawn_many([self.rect.centerx + offset for offset in offsets],
+                                self.rect.top - self.bullets.height, -self.bullet_speed)
 
     def upgrade(self, level):
         if level >= 10:
@@ -103,220 +130,470 @@ class Player:
             else:
                 self.lives -= 1
             self.invincible = True
-            self.invincible_start_time = time.time()
+            self.scheduler.call_at(self.clock.frame + INVINCIBLE_STEPS, self.end_invincibility)
 
-    def update_invincibility(self):
-        if self.invincible and time.time() - self.invincible_start_time > 2:
-            self.invincible = False
+    def end_invincibility(self):
+        self.invincible = False
 
-    def draw(self):
-        if self.invincible and int(time.time() * 5) % 2 == 0:
+    def draw(self, alpha=1.0):
+        if self.invincible and int(self.clock.time * 5) % 2 == 0:
             return
-        win.blit(ship_img, self.rect)
-        for bullet in self.bullets:
-            pygame.draw.rect(win, WHITE, bullet)
+        x = int(lerp(self.prev_x, self.rect.x, alpha))
+        renderer.blit(ship_img, (x, self.rect.y))
+        for rect in self.bullets.draw(win, bullet_img, alpha, renderer.enabled):
+            renderer.mark(rect)
         if self.shield:
-            pygame.draw.circle(win, BLUE, self.rect.center, 30, 2)
+            renderer.mark(pygame.draw.circle(win, BLUE, (x + self.rect.width // 2, self.rect.centery), 30, 2))
 
     def draw_hearts(self):
         for i in range(self.lives):
             draw_text("♥", WIDTH - (i + 1) * 30, 10, size=30, color=RED)
 
 class Monster:
-    def __init__(self, level):
+    def __init__(self, level, rng):
+        self.rng = rng
         self.is_boss = level == 10
         self.img = boss_img if self.is_boss else monster_img
         self.rect = self.img.get_rect(center=(WIDTH // 2, 100))
+        self.prev_x = self.rect.x
         self.speed = 3 if self.is_boss else 2 + level
         self.direction = 1
         self.health = 50 if self.is_boss else 5 + level * 2
         self.max_health = self.health
-        self.bullets = []
+        self.bullets = BulletSystem(*bullet_img.get_size())
+        self.bullet_speed = 7 + level * 0.3
         self.level = level
 
     def move(self):
+        self.prev_x = self.rect.x
         self.rect.x += self.speed * self.direction
         if self.rect.right >= WIDTH or self.rect.left <= 0:
             self.direction *= -1
 
     def shoot(self):
-        if random.random() < (0.07 if self.is_boss else 0.03):
+        if self.rng.random() < (0.07 if self.is_boss else 0.03):
             if self.is_boss:
-                for offset in (-40, -20, 0, 20, 40):
-                    bullet = bullet_img.get_rect(midtop=(self.rect.centerx + offset, self.rect.bottom))
-                    self.bullets.append(bullet)
+                offsets = (-40, -20, 0, 20, 40)
             else:
-                bullet = bullet_img.get_rect(midtop=self.rect.midbottom)
-                self.bullets.append(bullet)
-
-    def draw(self):
-        win.blit(self.img, self.rect)
-        pygame.draw.rect(win, RED, (self.rect.left, self.rect.top - 10, self.rect.width, 5))
+                offsets = (0,)
+            self.bullets.spawn_many([self.rect.centerx + offset for offset in offsets],
+                                    self.rect.bottom, self.bullet_speed)
+
+    def draw(self, alpha=1.0):
+        x = int(lerp(self.prev_x, self.rect.x, alpha))
+        renderer.blit(self.img, (x, self.rect.y))
+        renderer.mark(pygame.draw.rect(win, RED, (x, self.rect.top - 10, self.rect.width, 5)))
         health_ratio = self.health / self.max_health
-        pygame.draw.rect(win, GREEN, (self.rect.left, self.rect.top - 10, int(self.rect.width * health_ratio), 5))
-        for bullet in self.bullets:
-            pygame.draw.rect(win, RED, bullet)
+        pygame.draw.rect(win, GREEN, (x, self.rect.top - 10, int(self.rect.width * health_ratio), 5))
+        for rect in self.bullets.draw(win, monster_bullet_img, alpha, renderer.enabled):
+            renderer.mark(rect)
 
 class PowerUp:
-    def __init__(self):
-        self.types = ['shield', 'double', 'speed']
-        self.type = random.choice(self.types)
-        self.rect = pygame.Rect(random.randint(50, WIDTH - 50), -30, 25, 25)
+    types = ['shield', 'double', 'speed']
+    colors = {'shield': YELLOW, 'double': RED, 'speed': CYAN}
+
+    def __init__(self, rng):
+        self.type = rng.choice(self.types)
+        self.rect = pygame.Rect(rng.randint(50, WIDTH - 50), -30, 25, 25)
         self.speed = 3
-        self.color = {'shield': YELLOW, 'double': RED, 'speed': CYAN}[self.type]
+        self.color = self.colors[self.type]
 
     def move(self):
         self.rect.y += self.speed
 
-    def draw(self):
-        pygame.draw.ellipse(win, self.color, self.rect)
+    def draw(self, alpha=1.0):
+        renderer.mark(pygame.draw.ellipse(win, self.color, self.rect.move(0, -int(self.speed * (1 - alpha)))))
 
 def scroll_background(offset):
-    win.blit(bg_img, (0, offset % HEIGHT))
-    win.blit(bg_img, (0, (offset % HEIGHT) - HEIGHT))
+    if renderer.enabled:
+        # bg_img is a flat color, so scrolling it never changes a pixel and
+        # only the regions drawn over last frame need repainting
+        renderer.begin(bg_img)
+    else:
+        renderer.begin(None)
+        win.blit(bg_img, (0, offset % HEIGHT))
+        win.blit(bg_img, (0, (offset % HEIGHT) - HEIGHT))
 
+def draw_title(surface):
+    surface.fill(BLACK)
+    draw_text("SHIP vs MONSTER", WIDTH // 2, HEIGHT // 2 - 60, 50, GREEN, center=True, surface=surface)
+    draw_text("Press ENTER to Start", WIDTH // 2, HEIGHT // 2 + 10, 30, WHITE, center=True, surface=surface)
+    draw_text("Arrow keys to move, Space to shoot", WIDTH // 2, HEIGHT // 2 + 60, 20, CYAN, center=True, surface=surface)
+
+# Static screens sleep until an event arrives instead of polling
 def title_screen():
-    win.fill(BLACK)
-    draw_text("SHIP vs MONSTER", WIDTH // 2, HEIGHT // 2 - 60, 50, GREEN, center=True)
-    draw_text("Press ENTER to Start", WIDTH // 2, HEIGHT // 2 + 10, 30, WHITE, center=True)
-    draw_text("Arrow keys to move, Space to shoot", WIDTH // 2, HEIGHT // 2 + 60, 20, CYAN, center=True)
-    pygame.display.flip()
+    show(win, "ship_title", draw_title)
+    renderer.invalidate()
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: pygame.quit(); sys.exit()
+        for event in wait_events():
+            if event.type == pygame.QUIT: return False
+            if event.type in EXPOSE_EVENTS: show(win, "ship_title", draw_title)
             if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
-                return
+                return True
 
+# Returns "restart", BACK, or None when the window is closed
 def game_over_screen(score, high_score):
-    win.fill(BLACK)
-    draw_text("GAME OVER", WIDTH // 2, HEIGHT // 2 - 60, 50, RED, center=True)
-    draw_text(f"Score: {score}", WIDTH // 2, HEIGHT // 2, 30, WHITE, center=True)
-    draw_text(f"High Score: {high_score}", WIDTH // 2, HEIGHT // 2 + 40, 25, YELLOW, center=True)
-    draw_text("Press R to Restart or Q to Quit", WIDTH // 2, HEIGHT // 2 + 80, 25, WHITE, center=True)
-    pygame.display.flip()
-
-def boss_intro():
+    def draw(surface):
+        surface.fill(BLACK)
+        draw_text("GAME OVER", WIDTH // 2, HEIGHT // 2 - 60, 50, RED, center=True, surface=surface)
+        draw_text(f"Score: {score}", WIDTH // 2, HEIGHT // 2, 30, WHITE, center=True, surface=surface)
+        draw_text(f"High Score: {high_score}", WIDTH // 2, HEIGHT // 2 + 40, 25, YELLOW, center=True, surface=surface)
+        draw_text("Press R to Restart or Q to Quit", WIDTH // 2, HEIGHT // 2 + 80, 25, WHITE, center=True, surface=surface)
+
+    key = ("ship_game_over", score, high_score)
+    show(win, key, draw)
+    renderer.invalidate()
+    while True:
+        for event in wait_events():
+            if event.type == pygame.QUIT: return None
+            if event.type in EXPOSE_EVENTS: show(win, key, draw)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r: return "restart"
+                if event.key == pygame.K_q: return BACK
+
+def draw_boss_intro():
     win.fill(BLACK)
     draw_text("⚠️ BOSS INCOMING!", WIDTH // 2, HEIGHT // 2, 40, RED, center=True)
     pygame.display.flip()
-    pygame.time.delay(2000)
+    renderer.invalidate()
 
-def spawn_explosion(x, y):
-    explosions.append({"rect": explosion_img.get_rect(center=(x, y)), "time": time.time()})
+# Explosions are released by a timer on the session's scheduler
+def spawn_explosion(x, y, scheduler, frame):
+    ex = explosions.acquire()
+    if ex is None:  # pool exhausted; skip the effect rather than allocate
+        return
+    ex.rect.center = (x, y)
+    scheduler.call_at(frame + EXPLOSION_STEPS, explosions.release, ex)
 
 def draw_explosions():
-    for ex in explosions[:]:
-        win.blit(explosion_img, ex["rect"])
-        if time.time() - ex["time"] > 0.3:
-            explosions.remove(ex)
-
-def main():
-    title_screen()
-    level = 1
-    player = Player()
-    monster = Monster(level)
-    score = 0
-    bg_offset = 0
-    game_over = False
-    paused = False
-    powerup = None
-    high_score = load_high_score()
-
-    if level == 10: boss_intro()
-
-    while True:
-        clock.tick(60)
+    for ex in explosions.active:
+        renderer.blit(explosion_img, ex.rect)
+
+# Keyframe of a session: frame, RNG words drawn, level, score, background
+# offset, high score, flags (game over, boss intro pending, invincible, shield,
+# speed boost); the ship's x, previous x, bullet speed, lives, bullet level and
+# end of invincibility; the monster's x, previous x, direction and health; the
+# power-up's type (1-based, 0 for none) and position; then how many ship
+# bullets, monster bullets and explosions follow, each explosion as its
+# center and release frame
+SESSION_STATE = struct.Struct("<IQHIIIBhhBbBIhhbhBhhHHB")
+EXPLOSION_STATE = struct.Struct("<hhI")
+
+# One playthrough: everything that update() advances by one fixed step. All
+# randomness comes from the seed and all timing from the step count, so the
+# same seed and inputs always play out the same way.
+class Session:
+    def __init__(self, seed=None, high_score=0):
+        self.seed = seed
+        self.rng = SeededRandom(seed)
+        self.clock = GameClock()
+        self.scheduler = Scheduler()  # keyed on clock.frame
+        self.level = 1
+        self.player = Player(self.clock, self.scheduler)
+        self.monster = Monster(self.level, self.rng)
+        self.score = 0
+        self.bg_offset = 0
+        self.game_over = False
+        self.paused = False
+        self.powerup = None
+        self.high_score = high_score
+        self.boss_intro_pending = self.level == 10
+        explosions.clear()
+
+    def update(self, inputs):
+        self.clock.tick()
+        frame = self.clock.frame
+        player = self.player
+        if inputs & SHOOT:
+            player.shoot()
+        player.move(inputs)
+        self.scheduler.run(frame)
+        player.upgrade(self.level)
+
+        self.bg_offset += 1
+        profiler.lap("physics")
+
+        for x, y in player.bullets.advance(self.monster.rect, 0, HEIGHT):
+            self.monster.health -= 1
+            spawn_explosion(x, y, self.scheduler, frame)
+        profiler.lap("collision")
+
+        monster = self.monster
+        monster.move()
+        profiler.lap("physics")
+        monster.shoot()
+        profiler.lap("spawn")
+
+        if monster.bullets.advance(player.rect, 0, HEIGHT):
+            # the first hit makes the ship invincible, so the rest of the volley is absorbed
+            player.take_damage()
+            if player.lives <= 0:
+                self.game_over = True
+                self.high_score = max(self.high_score, self.score)
+        profiler.lap("collision")
+
+        if monster.health <= 0:
+            spawn_explosion(monster.rect.centerx, monster.rect.centery, self.scheduler, frame)
+            self.level += 1
+            self.score += 300 if monster.is_boss else 100
+            self.monster = Monster(self.level, self.rng)
+            if self.level == 10:
+                self.boss_intro_pending = True
+            if self.rng.random() < 0.5:
+                self.powerup = PowerUp(self.rng)
+            profiler.lap("spawn")
+
+        powerup = self.powerup
+        if powerup:
+            powerup.move()
+            if powerup.rect.colliderect(player.rect):
+                if powerup.type == 'shield':
+                    player.shield = True
+                elif powerup.type == 'double':
+                    player.bullet_level = min(player.bullet_level + 1, 4)
+                elif powerup.type == 'speed':
+                    player.speed_boost = True
+                self.powerup = None
+            elif powerup.rect.top > HEIGHT:
+                self.powerup = None
+        profiler.lap("update")
+
+    def draw(self, alpha=1.0):
+        scroll_background(self.bg_offset)
+        self.player.draw(alpha)
+        self.monster.draw(alpha)
+        if self.powerup: self.powerup.draw(alpha)
+        draw_explosions()
+        profiler.lap("draw")
+        self.player.draw_hearts()
+        if self.paused:
+            draw_text("PAUSED", WIDTH // 2, HEIGHT // 2, 50, YELLOW, center=True)
+        else:
+            draw_text(f"Level: {self.level}", 10, 10)
+            draw_text(f"Score: {self.score}", 10, 40)
+            draw_text(f"High Score: {self.high_score}", 10, 70, 20, YELLOW)
+        profiler.lap("text")
+        profiler.draw(renderer.blit)
+        profiler.lap("profiler")
+        renderer.present()
+        profiler.lap("present")
+
+    # Full state as bytes, for replay keyframes
+    def keyframe(self):
+        player, monster, powerup = self.player, self.monster, self.powerup
+        invincible_until = 0
+        effects = []
+        for when, _, callback, args in sorted(self.scheduler.heap):  # firing order, as restore() reschedules
+            if callback == player.end_invincibility:
+                invincible_until = when
+            elif callback == explosions.release:
+                effects.append(EXPLOSION_STATE.pack(*args[0].rect.center, when))
+        flags = (self.game_over | self.boss_intro_pending << 1 | player.invincible << 2 |
+                 player.shield << 3 | player.speed_boost << 4)
+        kind = PowerUp.types.index(powerup.type) + 1 if powerup else 0
+        powerup_x, powerup_y = powerup.rect.topleft if powerup else (0, 0)
+        head = SESSION_STATE.pack(self.clock.frame, self.rng.words, self.level, self.score, self.bg_offset,
+                                  self.high_score, flags, player.rect.x, player.prev_x, player.bullet_speed,
+                                  player.lives, player.bullet_level, invincible_until, monster.rect.x,
+                                  monster.prev_x, monster.direction, monster.health, kind, powerup_x, powerup_y,
+                                  len(player.bullets), len(monster.bullets), len(effects))
+        return head + player.bullets.pack() + monster.bullets.pack() + b"".join(effects)
+
+    def restore(self, data):
+        (self.clock.frame, words, self.level, self.score, self.bg_offset, self.high_score, flags,
+         x, prev_x, bullet_speed, lives, bullet_level, invincible_until,
+         monster_x, monster_prev_x, direction, health, kind, powerup_x, powerup_y,
+         player_bullets, monster_bullets, effects) = SESSION_STATE.unpack_from(data)
+        self.game_over, self.boss_intro_pending = bool(flags & 1), bool(flags & 2)
+        player = self.player
+        player.rect.x, player.prev_x = x, prev_x
+        player.bullet_speed, player.lives, player.bullet_level = bullet_speed, lives, bullet_level
+        player.invincible, player.shield, player.speed_boost = bool(flags & 4), bool(flags & 8), bool(flags & 16)
+        monster = self.monster = Monster(self.level, self.rng)
+        monster.rect.x, monster.prev_x, monster.direction, monster.health = monster_x, monster_prev_x, direction, health
+        self.powerup = None
+        if kind:
+            powerup = self.powerup = PowerUp(self.rng)
+            powerup.type = PowerUp.types[kind - 1]
+            powerup.color = PowerUp.colors[powerup.type]
+            powerup.rect.topleft = (powerup_x, powerup_y)
+        self.rng.restore(words)  # after PowerUp() has drawn from it
+        offset = player.bullets.unpack(data, SESSION_STATE.size, player_bullets)
+        offset = monster.bullets.unpack(data, offset, monster_bullets)
+
+        self.scheduler.clear()
+        if invincible_until:
+            self.scheduler.call_at(invincible_until, player.end_invincibility)
+        explosions.clear()
+        for k in range(effects):
+            x, y, when = EXPLOSION_STATE.unpack_from(data, offset + k * EXPLOSION_STATE.size)
+            ex = explosions.acquire()
+            ex.rect.center = (x, y)
+            self.scheduler.call_at(when, explosions.release, ex)
+
+    # Final state, for checking that a replay ended up in the same place
+    def summary(self):
+        return {
+            "frame": self.clock.frame,
+            "level": self.level,
+            "score": self.score,
+            "lives": self.player.lives,
+            "monster_health": self.monster.health,
+            "game_over": self.game_over,
+        }
+
+# Top-level game states. Each state's handler runs until the state changes and
+# returns the next one, or None (window closed) or BACK to leave the game.
+TITLE, PLAYING, PAUSED, BOSS_INTRO, GAME_OVER = "title", "playing", "paused", "boss_intro", "game_over"
+
+# Owns the current Session and moves between states in a flat loop, so
+# restarting replaces the session instead of nesting another main() call
+class Game:
+    def __init__(self, clock=None):
+        self.timestep = FixedTimestep() if clock is None else FixedTimestep(clock=clock)
+        self.session = None
+        self.recorder = None
+        self.shots = 0
+        self.transitions = Scheduler()  # timed state changes, on the timestep's clock
+        self.next_state = None
+        self.handlers = {
+            TITLE: self.title,
+            PLAYING: self.playing,
+            PAUSED: self.paused,
+            BOSS_INTRO: self.boss_intro,
+            GAME_OVER: self.game_over,
+        }
+
+    def run(self, state=TITLE):
+        while state in self.handlers:
+            state = self.handlers[state]()
+        self.end_session()
+        return state
+
+    # Drops everything the last playthrough left behind and starts a new one
+    def start_session(self):
+        self.end_session()
+        seed = session_seed()
+        self.session = Session(seed, load_high_score())
+        self.recorder = open_recorder("ship_vs_monster", seed, self.session.keyframe, 3)
+        self.shots = 0
+        self.timestep.reset()
+
+    def end_session(self):
+        if self.recorder is not None:
+            self.recorder.close(self.session.summary())
+        self.session = self.recorder = None
+        explosions.clear()
+
+    def title(self):
+        if not title_screen():
+            return None
+        self.start_session()
+        return PLAYING
+
+    def playing(self):
+        session, recorder, timestep = self.session, self.recorder, self.timestep
+        while True:
+            profiler.start_frame()
+            clock.tick(RENDER_FPS)
+            profiler.lap("wait")
 
-        if not game_over:
             for event in pygame.event.get():
-                if event.type == pygame.QUIT: pygame.quit(); sys.exit()
+                if profiler.handle(event):
+                    continue
+                if event.type == pygame.QUIT:
+                    return None
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE: player.shoot()
-                    if event.key == pygame.K_p: paused = not paused
-
-            if paused:
-                scroll_background(bg_offset)
-                player.draw()
-                monster.draw()
-                if powerup: powerup.draw()
-                draw_explosions()
-                player.draw_hearts()
-                draw_text("PAUSED", WIDTH // 2, HEIGHT // 2, 50, YELLOW, center=True)
-                pygame.display.flip()
-                continue
+                    if event.key == pygame.K_SPACE: self.shots += 1
+                    if event.key == pygame.K_p: return PAUSED
+            profiler.lap("events")
 
             keys = pygame.key.get_pressed()
-            player.move(keys)
-            player.update_invincibility()
-            player.upgrade(level)
-
-            bg_offset += 1
-            scroll_background(bg_offset)
-
-            for bullet in player.bullets[:]:
-                bullet.y -= player.bullet_speed
-                if bullet.colliderect(monster.rect):
-                    player.bullets.remove(bullet)
-                    monster.health -= 1
-                    spawn_explosion(bullet.centerx, bullet.centery)
-                elif bullet.y < 0:
-                    player.bullets.remove(bullet)
-
-            monster.move()
-            monster.shoot()
-
-            for bullet in monster.bullets[:]:
-                bullet.y += 7 + (level * 0.3)
-                if bullet.colliderect(player.rect):
-                    monster.bullets.remove(bullet)
-                    player.take_damage()
-                    if player.lives <= 0:
-                        game_over = True
-                        if score > high_score:
-                            high_score = score
-                            save_high_score(high_score)
-                elif bullet.y > HEIGHT:
-                    monster.bullets.remove(bullet)
-
-            if monster.health <= 0:
-                spawn_explosion(monster.rect.centerx, monster.rect.centery)
-                level += 1
-                score += 300 if monster.is_boss else 100
-                monster = Monster(level)
-                if level == 10:
-                    boss_intro()
-                if random.random() < 0.5:
-                    powerup = PowerUp()
-
-            if powerup:
-                powerup.move()
-                if powerup.rect.colliderect(player.rect):
-                    if powerup.type == 'shield':
-                        player.shield = True
-                    elif powerup.type == 'double':
-                        player.bullet_level = min(player.bullet_level + 1, 4)
-                    elif powerup.type == 'speed':
-                        player.speed_boost = True
-                    powerup = None
-                elif powerup.rect.top > HEIGHT:
-                    powerup = None
-
-            player.draw()
-            monster.draw()
-            if powerup: powerup.draw()
-            draw_explosions()
-            player.draw_hearts()
-            draw_text(f"Level: {level}", 10, 10)
-            draw_text(f"Score: {score}", 10, 40)
-            draw_text(f"High Score: {high_score}", 10, 70, 20, YELLOW)
-            pygame.display.flip()
-        else:
-            game_over_screen(score, high_score)
+            inputs = 0
+            if keys[pygame.K_LEFT]: inputs |= LEFT
+            if keys[pygame.K_RIGHT]: inputs |= RIGHT
+            state = PLAYING
+            for _ in range(timestep.steps()):
+                # each Space press fires on its own step
+                step_inputs = inputs | SHOOT if self.shots else inputs
+                self.shots = max(self.shots - 1, 0)
+                recorder.record(step_inputs)
+                session.update(step_inputs)
+                if session.game_over:
+                    recorder.close(session.summary())
+                    save_high_score(session.score)
+                    state = GAME_OVER
+                    break
+                if session.boss_intro_pending:
+                    state = BOSS_INTRO
+                    break
+            session.draw(timestep.alpha)
+            profiler.end_frame()
+            if state != PLAYING:
+                return state
+
+    # Nothing moves while paused, so the paused frame is drawn once and the
+    # loop sleeps until an event arrives
+    def paused(self):
+        session = self.session
+        session.paused = True
+        session.draw()
+        while True:
+            for event in wait_events():
+                if profiler.handle(event) or event.type in EXPOSE_EVENTS:
+                    renderer.invalidate()
+                    session.draw()
+                    continue
+                if event.type == pygame.QUIT:
+                    return None
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                    session.paused = False
+                    self.timestep.reset()
+                    return PLAYING
+
+    def go(self, state):
+        self.next_state = state
+
+    # The warning stays up for BOSS_INTRO_SECONDS while events are still
+    # handled, so the window can be closed or uncovered during it
+    def boss_intro(self):
+        self.session.boss_intro_pending = False
+        draw_boss_intro()
+        now = self.timestep.clock
+        self.next_state = None
+        self.transitions.call_at(now() + BOSS_INTRO_SECONDS, self.go, PLAYING)
+        while self.next_state is None:
+            clock.tick(60)
             for event in pygame.event.get():
-                if event.type == pygame.QUIT: pygame.quit(); sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r: main()
-                    if event.key == pygame.K_q: pygame.quit(); sys.exit()
+                if event.type == pygame.QUIT:
+                    self.transitions.clear()
+                    return None
+                if event.type in EXPOSE_EVENTS:
+                    draw_boss_intro()
+            self.transitions.run(now())
+        self.timestep.reset()
+        return self.next_state
+
+    def game_over(self):
+        session = self.session
+        choice = game_over_screen(session.score, session.high_score)
+        if choice == "restart":
+            self.end_session()
+            return TITLE
+        return choice
+
+def main():
+    return Game().run()
+
+# Scene entry point
+def run(surface):
+    global win, renderer
+    win = surface
+    renderer = DirtyRenderer(surface)
+    return main()
 
 if __name__ == "__main__":
-    main()
+    manager = SceneManager()
+    manager.register("ship_vs_monster", run, (WIDTH, HEIGHT), "Ship vs Monster")
+    manager.run("ship_vs_monster")
+    pygame.quit()
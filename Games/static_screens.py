@@ -0,0 +1,46 @@
+from collections import OrderedDict
+
+import pygame
+
+# Window events after which whatever was on screen has to be drawn again
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED)
+
+
+# Full-window images for screens that never change while shown (title, start,
+# game over and menu screens), keyed on whatever their content depends on.
+# compose(surface) draws a screen once; after that it is a single blit.
+class ScreenCache:
+    def __init__(self, max_size=16):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+
+    def get(self, key, size, compose):
+        key = (key, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = pygame.Surface(size).convert()
+        compose(surface)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+screen_cache = ScreenCache()
+
+
+# Blit a cached screen over the whole window and show it
+def show(target, key, compose):
+    target.blit(screen_cache.get(key, target.get_size(), compose), (0, 0))
+    pygame.display.flip()
+
+
+# Sleep until at least one event arrives, then take everything queued, so a
+# screen that only changes on input costs no CPU while idle
+def wait_events():
+    return [pygame.event.wait()] + pygame.event.get()
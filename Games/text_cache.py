@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+import pygame
+
+# Rendered text surfaces keyed on (font, text, color, antialias). Labels that
+# don't change between frames are blitted from here instead of re-rendered;
+# the least recently used surfaces are dropped once the cache is full.
+class TextCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color, antialias=True):
+        key = (font, text, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+text_cache = TextCache()
+
+
+def render_text(font, text, color, antialias=True):
+    return text_cache.render(font, text, color, antialias)
+
+
+# SysFont lookups are slow, so each (face, size, bold) is loaded once per process
+fonts = {}
+
+
+def get_font(face, size, bold=False):
+    key = (face, size, bold)
+    font = fonts.get(key)
+    if font is None:
+        font = fonts[key] = pygame.font.SysFont(face, size, bold=bold)
+    return font
@@ -0,0 +1,633 @@
+import bisect
+import math
+import random
+import struct
+import sys
+import time
+from array import array
+
+import numpy as np
+import pygame
+
+from fixed_step import lerp
+from replay import SeededRandom
+from scheduler import Scheduler
+
+# Input bits for step()
+LEFT = 1
+RIGHT = 2
+
+FPS = 60
+VANISH_FRAMES = FPS  # platforms disappear 1 second after being touched at level 90+
+VISIBLE_PLATFORM_LIMIT = 7
+PLATFORM_POOL_SIZE = 16
+
+# Keyframe of one game: ball x, y and speed, camera, frame, score, level,
+# flags, RNG words drawn, next platform ID and platform count, then each
+# platform's ID, x, y, visited flag and vanish frame (0 if none)
+GAME_STATE = struct.Struct("<hdddIIBBQIB")
+PLATFORM_STATE = struct.Struct("<IhiBI")
+GAME_OVER, WIN, TOUCHED = 1, 2, 4  # flags
+
+
+# Slot numbers ordered by platform y, top of the tower first. Lets collision
+# and spawn checks look only at the rows around a given height.
+class PlatformIndex:
+    def __init__(self):
+        self.ys = []
+        self.slots = []
+
+    def insert(self, y, slot):
+        i = bisect.bisect_right(self.ys, y)
+        self.ys.insert(i, y)
+        self.slots.insert(i, slot)
+
+    def remove(self, y, slot):
+        i = bisect.bisect_left(self.ys, y)
+        while self.slots[i] != slot:
+            i += 1
+        del self.ys[i]
+        del self.slots[i]
+
+    # Slots with top <= y < bottom
+    def between(self, top, bottom):
+        lo = bisect.bisect_left(self.ys, top)
+        hi = bisect.bisect_left(self.ys, bottom, lo)
+        return self.slots[lo:hi]
+
+    # Highest slot with y >= top
+    def first(self, top):
+        i = bisect.bisect_left(self.ys, top)
+        return self.slots[i] if i < len(self.slots) else None
+
+    # Slots with y >= bottom, lowest first
+    def below(self, bottom):
+        lo = bisect.bisect_left(self.ys, bottom)
+        return self.slots[lo:][::-1]
+
+
+# Fixed set of platform slots that are recycled once a platform scrolls off
+# the bottom or vanishes, so per-frame work doesn't grow with the climb.
+# Rects are in tower coordinates; the engine's camera maps them to screen.
+# Per-slot state lives in flat arrays: an integer ID that increases with every
+# platform spawned (0 for a free slot) and whether the ball has scored on it,
+# so spawning and bouncing allocate nothing and the visited state can't
+# outgrow the pool.
+class PlatformPool:
+    def __init__(self, capacity, pw, ph):
+        self.capacity = capacity
+        self.rects = [pygame.Rect(0, 0, pw, ph) for _ in range(capacity)]
+        self.ids = array("q", [0]) * capacity
+        self.visited = bytearray(capacity)
+        self.timers = [None] * capacity  # pending vanish timer of a touched platform
+        self.next_id = 1
+        self.active = []
+        self.free = list(range(capacity - 1, -1, -1))
+        self.index = PlatformIndex()
+
+    def __len__(self):
+        return len(self.active)
+
+    def acquire(self, x, y):
+        if not self.free:
+            return None
+        i = self.free.pop()
+        self.rects[i].topleft = (x, y)
+        self.ids[i] = self.next_id
+        self.next_id += 1
+        self.visited[i] = 0
+        self.timers[i] = None
+        self.active.append(i)
+        self.index.insert(y, i)
+        return i
+
+    def release(self, i):
+        self.active.remove(i)
+        self.index.remove(self.rects[i].y, i)
+        self.ids[i] = 0
+        self.visited[i] = 0
+        self.timers[i] = None
+        self.free.append(i)
+
+    def clear(self):
+        for i in self.active[:]:
+            self.release(i)
+
+    def top_y(self):
+        return self.index.ys[0]
+
+    def near(self, top, bottom):
+        return self.index.between(top, bottom)
+
+
+# Gravity and jump strength multiplier; works on a level or an array of them
+def difficulty(level):
+    return 1 + ((level - 1) // 10) * 0.1
+
+
+# Fills the pool up to limit platforms, each 60-100 px above the last, the
+# first at first_y. Shared by TowerEngine and TowerBatch so both build the
+# same tower from the same seed.
+def spawn_platforms(pool, rng, width, pw, first_y, limit):
+    rects = pool.rects
+    while len(pool) < limit:
+        max_attempts = 100
+        while max_attempts > 0:
+            x = rng.randint(0, width - pw)
+            if pool.active:
+                y = pool.top_y() - rng.randint(60, 100)
+            else:
+                y = first_y
+            too_close = any(abs(rects[i].x - x) < pw for i in pool.near(y - 19, y + 20))
+            if not too_close:
+                pool.acquire(x, y)
+                break
+            max_attempts -= 1
+        if max_attempts == 0:
+            break
+
+
+# Score for a bounce off slot i: 10 the first time each platform is landed
+# on, a level every 100. Returns the new score and level.
+def score_bounce(pool, i, score, level):
+    if not pool.visited[i]:
+        pool.visited[i] = 1
+        score += 10
+        if score // 100 + 1 > level:
+            level += 1
+    return score, level
+
+
+# Keyframe of one game, in the layout above
+def pack_game(fields, words, pool):
+    rects, ids, visited, timers = pool.rects, pool.ids, pool.visited, pool.timers
+    parts = [GAME_STATE.pack(*fields, words, pool.next_id, len(pool.active))]
+    parts += [PLATFORM_STATE.pack(ids[i], rects[i].x, rects[i].y, visited[i], timers[i][0] if timers[i] else 0)
+              for i in pool.active]
+    return b"".join(parts)
+
+
+# The fields, RNG words, next platform ID and platforms of the game packed at
+# offset, and the offset after it
+def unpack_game(data, offset):
+    *fields, words, next_id, count = GAME_STATE.unpack_from(data, offset)
+    offset += GAME_STATE.size
+    platforms = [PLATFORM_STATE.unpack_from(data, offset + k * PLATFORM_STATE.size) for k in range(count)]
+    return fields, words, next_id, platforms, offset + count * PLATFORM_STATE.size
+
+
+# Refills a pool with (ID, x, y, visited, vanish frame) platforms, in order.
+# Returns (slot, vanish frame) for each platform whose timer was running.
+def load_platforms(pool, platforms):
+    pool.clear()
+    timers = []
+    for pid, x, y, visited, vanish_at in platforms:
+        i = pool.acquire(x, y)
+        pool.ids[i] = pid
+        pool.visited[i] = visited
+        if vanish_at:
+            timers.append((i, vanish_at))
+    return timers
+
+
+# Tower Jump physics without any display calls. Coordinates are local to the
+# play field (0..width); front-ends add their own x offset when drawing.
+# One step() is one frame at FPS.
+class TowerEngine:
+    def __init__(self, width=400, height=600, rng=random, platform_limit=VISIBLE_PLATFORM_LIMIT):
+        self.width = width
+        self.height = height
+        self.rng = rng
+        self.platform_limit = platform_limit
+        self.profiler = None  # a FrameProfiler to charge step phases to
+        self.reset()
+
+    def reset(self):
+        self.ball_radius = 15
+        self.ball_x = self.width // 2
+        self.ball_y = self.height - self.ball_radius
+        self.ball_speed_y = 0
+        self.gravity = 0.5
+        self.jump_power = -10
+        self.pw, self.ph = 80, 10
+
+        self.pool = PlatformPool(max(PLATFORM_POOL_SIZE, self.platform_limit * 2 + 2), self.pw, self.ph)
+        self.scheduler = Scheduler()  # keyed on self.frame
+        self.score = 0
+        self.level = 1
+        self.scroll = 0
+        self.camera = 0
+        self.prev_ball_x, self.prev_ball_y, self.prev_camera = self.ball_x, self.ball_y, 0
+        self.frame = 0
+        self.game_over = False
+        self.win = False
+        self.has_touched = False
+
+        self.spawn_platforms()
+
+    def difficulty(self):
+        return difficulty(self.level)
+
+    def spawn_platforms(self):
+        spawn_platforms(self.pool, self.rng, self.width, self.pw, self.height - 60 - self.view_offset(),
+                        self.platform_limit)
+
+    def vanish(self, i):
+        self.pool.timers[i] = None
+        self.release_platform(i)
+
+    def release_platform(self, i):
+        pool = self.pool
+        if pool.timers[i] is not None:
+            self.scheduler.cancel(pool.timers[i])
+        pool.release(i)
+
+    # Tower-to-screen y offset
+    def view_offset(self):
+        return int(self.camera)
+
+    def ball_rect(self):
+        r = self.ball_radius
+        return pygame.Rect(self.ball_x - r, self.ball_y - r, r * 2, r * 2)
+
+    def step(self, inputs=0):
+        self.prev_ball_x, self.prev_ball_y, self.prev_camera = self.ball_x, self.ball_y, self.camera
+        self.frame += 1
+        r = self.ball_radius
+        height = self.height
+
+        if not self.win:
+            if inputs & LEFT: self.ball_x -= 5
+            if inputs & RIGHT: self.ball_x += 5
+            if self.ball_x < -r: self.ball_x = self.width + r
+            if self.ball_x > self.width + r: self.ball_x = -r
+
+            self.ball_speed_y += self.gravity * self.difficulty()
+            self.ball_y += self.ball_speed_y
+
+        if self.ball_y >= height - r:
+            if self.has_touched:
+                self.game_over = True
+            else:
+                self.ball_y = height - r
+                self.ball_speed_y = self.jump_power
+
+        pool = self.pool
+        rects = pool.rects
+        if self.ball_y < height // 3 and self.ball_speed_y < 0:
+            self.scroll = height // 3 - self.ball_y
+            self.ball_y = height // 3
+            self.camera += self.scroll
+            for i in pool.index.below(height - self.view_offset()):
+                self.release_platform(i)
+        else:
+            self.scroll = 0
+
+        prof = self.profiler
+        if prof: prof.lap("physics")
+
+        ball_rect = self.ball_rect().move(0, -self.view_offset())
+        if self.ball_speed_y > 0:
+            for i in pool.near(ball_rect.top - self.ph + 1, ball_rect.bottom):
+                if rects[i].colliderect(ball_rect) and self.ball_speed_y > 0:
+                    self.ball_speed_y = self.jump_power * self.difficulty()
+                    self.has_touched = True
+                    self.score, self.level = score_bounce(pool, i, self.score, self.level)
+                    if self.level == 100: self.win = True
+                    if self.level >= 90 and pool.timers[i] is None:
+                        pool.timers[i] = self.scheduler.call_at(self.frame + VANISH_FRAMES + 1, self.vanish, i)
+
+        self.scheduler.run(self.frame)
+        if prof: prof.lap("collision")
+
+        self.spawn_platforms()
+        if prof: prof.lap("spawn")
+
+    # Final state of a run, for checking that a replay ended up in the same place
+    def summary(self):
+        return {
+            "frame": self.frame,
+            "score": self.score,
+            "level": self.level,
+            "ball": [self.ball_x, self.ball_y],
+            "camera": self.camera,
+            "game_over": self.game_over,
+            "win": self.win,
+        }
+
+    # Everything in a keyframe but the platforms and the RNG
+    def state_fields(self):
+        flags = self.game_over * GAME_OVER + self.win * WIN + self.has_touched * TOUCHED
+        return (self.ball_x, self.ball_y, self.ball_speed_y, self.camera,
+                self.frame, self.score, self.level, flags)
+
+    # Puts the engine in the state given by state_fields() and a platform list
+    # as load_platforms() takes it
+    def load(self, fields, platforms, next_id=None):
+        (self.ball_x, self.ball_y, self.ball_speed_y, self.camera,
+         self.frame, self.score, self.level, flags) = fields
+        self.game_over, self.win, self.has_touched = bool(flags & GAME_OVER), bool(flags & WIN), bool(flags & TOUCHED)
+        self.prev_ball_x, self.prev_ball_y, self.prev_camera = self.ball_x, self.ball_y, self.camera
+        self.scheduler.clear()
+        for i, when in load_platforms(self.pool, platforms):
+            self.pool.timers[i] = self.scheduler.call_at(when, self.vanish, i)
+        if next_id is not None:
+            self.pool.next_id = next_id
+
+    # Full state as bytes, for replay keyframes; needs a SeededRandom rng
+    def keyframe(self):
+        return pack_game(self.state_fields(), self.rng.words, self.pool)
+
+    def restore(self, data):
+        fields, words, next_id, platforms, _ = unpack_game(data, 0)
+        self.rng.restore(words)
+        self.load(fields, platforms, next_id)
+
+    # Screen-space platforms, alpha of the way from the previous step to this one
+    def visible_platforms(self, alpha=1.0):
+        rects = self.pool.rects
+        offset = int(self.prev_camera + (self.camera - self.prev_camera) * alpha)
+        return [rects[i].move(0, offset) for i in self.pool.active]
+
+    def ball_position(self, alpha=1.0):
+        x = lerp_x(self.prev_ball_x, self.ball_x, alpha, self.width)
+        return int(x), int(lerp(self.prev_ball_y, self.ball_y, alpha))
+
+
+# Several Tower Jump games stepped together, e.g. one per split-screen
+# player, all climbing the tower built from one seed. Ball state is kept in
+# NumPy arrays with one row per game, and steering, wrap-around, gravity, the
+# floor and camera scrolling run as one vector pass per step over every game
+# still playing. The per-game platform work (releases, bounces, vanish timers,
+# spawning) only runs for the games that need it that step, on the same pools
+# and helpers TowerEngine uses, so each game plays out exactly as a
+# TowerEngine would with the same seed and inputs. Finished games are frozen.
+class TowerBatch:
+    def __init__(self, count, width=400, height=600, platform_limit=VISIBLE_PLATFORM_LIMIT):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.platform_limit = platform_limit
+        self.ball_radius = 15
+        self.gravity = 0.5
+        self.jump_power = -10
+        self.pw, self.ph = 80, 10
+        self.profiler = None  # a FrameProfiler to charge step phases to
+        self.reset()
+
+    def reset(self, seed=None):
+        n = self.count
+        self.rngs = [SeededRandom(seed) for _ in range(n)]
+        capacity = max(PLATFORM_POOL_SIZE, self.platform_limit * 2 + 2)
+        self.pools = [PlatformPool(capacity, self.pw, self.ph) for _ in range(n)]
+        self.schedulers = [Scheduler() for _ in range(n)]  # keyed on frame[i]
+        self.ball_x = np.full(n, self.width // 2, dtype=np.int64)
+        self.ball_y = np.full(n, self.height - self.ball_radius, dtype=np.float64)
+        self.ball_speed_y = np.zeros(n)
+        self.camera = np.zeros(n)
+        self.prev_ball_x, self.prev_ball_y, self.prev_camera = self.ball_x.copy(), self.ball_y.copy(), self.camera.copy()
+        self.frame = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.level = np.ones(n, dtype=np.int64)
+        self.game_over = np.zeros(n, dtype=np.bool_)
+        self.win = np.zeros(n, dtype=np.bool_)
+        self.has_touched = np.zeros(n, dtype=np.bool_)
+        self.fall = np.full(n, self.gravity * difficulty(1))  # gravity per step at each game's level
+        for i in range(n):
+            self.spawn_platforms(i)
+
+    def view_offset(self, i):
+        return int(self.camera[i])
+
+    def spawn_platforms(self, i):
+        spawn_platforms(self.pools[i], self.rngs[i], self.width, self.pw,
+                        self.height - 60 - self.view_offset(i), self.platform_limit)
+
+    def vanish(self, i, slot):
+        self.pools[i].timers[slot] = None
+        self.release_platform(i, slot)
+
+    def release_platform(self, i, slot):
+        pool = self.pools[i]
+        if pool.timers[slot] is not None:
+            self.schedulers[i].cancel(pool.timers[slot])
+        pool.release(slot)
+
+    # inputs holds one LEFT/RIGHT mask per game. Games left out of active,
+    # e.g. a networked player whose input hasn't arrived yet, sit this step out.
+    def step(self, inputs, active=None):
+        playing = ~(self.game_over | self.win)
+        if active is not None:
+            playing &= active
+        live = np.flatnonzero(playing).tolist()
+        if not live:
+            return
+        r = self.ball_radius
+        width, height = self.width, self.height
+        x, y, vy, camera = self.ball_x, self.ball_y, self.ball_speed_y, self.camera
+        np.copyto(self.prev_ball_x, x, where=playing)
+        np.copyto(self.prev_ball_y, y, where=playing)
+        np.copyto(self.prev_camera, camera, where=playing)
+        self.frame += playing
+
+        # Finished games get no steering and no gravity, and the wrap-around
+        # leaves a ball already inside [-r, width + r] where it is, so the
+        # movement itself needs no masking
+        x += [5 * ((mask & RIGHT != 0) - (mask & LEFT != 0)) for mask in inputs] * playing
+        x[x < -r] = width + r
+        x[x > width + r] = -r
+        vy += self.fall * playing
+        y += vy * playing
+
+        floor = playing & (y >= height - r)
+        if floor.any():
+            self.game_over |= floor & self.has_touched
+            bounce = floor & ~self.has_touched
+            y[bounce] = height - r
+            vy[bounce] = self.jump_power
+
+        scroll = playing & (y < height // 3) & (vy < 0)
+        if scroll.any():
+            camera[scroll] += height // 3 - y[scroll]
+            y[scroll] = height // 3
+            for i in np.flatnonzero(scroll).tolist():
+                for slot in self.pools[i].index.below(height - self.view_offset(i)):
+                    self.release_platform(i, slot)
+
+        prof = self.profiler
+        if prof: prof.lap("physics")
+
+        ph = self.ph
+        falling = (vy > 0).tolist()
+        for i in live:
+            if not falling[i]:
+                continue
+            pool = self.pools[i]
+            rects = pool.rects
+            ball_rect = pygame.Rect(int(x[i]) - r, float(y[i]) - r, r * 2, r * 2).move(0, -self.view_offset(i))
+            for slot in pool.near(ball_rect.top - ph + 1, ball_rect.bottom):
+                if rects[slot].colliderect(ball_rect):
+                    level = int(self.level[i])
+                    vy[i] = self.jump_power * difficulty(level)
+                    self.has_touched[i] = True
+                    score, level = score_bounce(pool, slot, int(self.score[i]), level)
+                    self.score[i], self.level[i] = score, level
+                    self.fall[i] = self.gravity * difficulty(level)
+                    if level == 100: self.win[i] = True
+                    if level >= 90 and pool.timers[slot] is None:
+                        when = int(self.frame[i]) + VANISH_FRAMES + 1
+                        pool.timers[slot] = self.schedulers[i].call_at(when, self.vanish, i, slot)
+                    break
+
+        for i in live:
+            scheduler = self.schedulers[i]
+            if len(scheduler):
+                scheduler.run(int(self.frame[i]))
+        if prof: prof.lap("collision")
+
+        limit = self.platform_limit
+        for i in live:
+            if len(self.pools[i]) < limit:
+                self.spawn_platforms(i)
+        if prof: prof.lap("spawn")
+
+    # One game's final state, or every game's as a list
+    def summary(self, i=None):
+        if i is None:
+            return [self.summary(i) for i in range(self.count)]
+        return {
+            "frame": int(self.frame[i]),
+            "score": int(self.score[i]),
+            "level": int(self.level[i]),
+            "ball": [int(self.ball_x[i]), float(self.ball_y[i])],
+            "camera": float(self.camera[i]),
+            "game_over": bool(self.game_over[i]),
+            "win": bool(self.win[i]),
+        }
+
+    # Every game's state, each as TowerEngine.keyframe() packs it
+    def keyframe(self):
+        flags = self.game_over * GAME_OVER + self.win * WIN + self.has_touched * TOUCHED
+        columns = zip(self.ball_x.tolist(), self.ball_y.tolist(), self.ball_speed_y.tolist(), self.camera.tolist(),
+                      self.frame.tolist(), self.score.tolist(), self.level.tolist(), flags.tolist())
+        return b"".join(pack_game(fields, rng.words, pool) for fields, rng, pool in zip(columns, self.rngs, self.pools))
+
+    def restore(self, data):
+        offset = 0
+        for i in range(self.count):
+            fields, words, next_id, platforms, offset = unpack_game(data, offset)
+            (self.ball_x[i], self.ball_y[i], self.ball_speed_y[i], self.camera[i],
+             self.frame[i], self.score[i], self.level[i], flags) = fields
+            self.game_over[i], self.win[i], self.has_touched[i] = flags & GAME_OVER, flags & WIN, flags & TOUCHED
+            self.fall[i] = self.gravity * difficulty(self.level[i])
+            self.rngs[i].restore(words)
+            pool, scheduler = self.pools[i], self.schedulers[i]
+            scheduler.clear()
+            for slot, when in load_platforms(pool, platforms):
+                pool.timers[slot] = scheduler.call_at(when, self.vanish, i, slot)
+            pool.next_id = next_id
+        np.copyto(self.prev_ball_x, self.ball_x)
+        np.copyto(self.prev_ball_y, self.ball_y)
+        np.copyto(self.prev_camera, self.camera)
+
+    # Screen-space platforms of game i, alpha of the way from its previous step
+    def visible_platforms(self, i, alpha=1.0):
+        pool = self.pools[i]
+        rects = pool.rects
+        prev = float(self.prev_camera[i])
+        offset = int(prev + (float(self.camera[i]) - prev) * alpha)
+        return [rects[slot].move(0, offset) for slot in pool.active]
+
+    def ball_position(self, i, alpha=1.0):
+        x = lerp_x(int(self.prev_ball_x[i]), int(self.ball_x[i]), alpha, self.width)
+        return int(x), int(lerp(float(self.prev_ball_y[i]), float(self.ball_y[i]), alpha))
+
+
+# Shortest sideways move covering dx when x positions repeat every wrap
+def wrap_dx(dx, wrap):
+    dx %= wrap
+    return dx - wrap if dx > wrap / 2 else dx
+
+
+# Ball x drawn alpha of the way through a step from prev_x. A ball that has
+# just wrapped round is drawn where it is, not smeared across the field.
+def lerp_x(prev_x, x, alpha, width):
+    return lerp(prev_x, x, alpha) if abs(x - prev_x) < width // 2 else x
+
+
+# Input that steers a ball at tower height y, falling at vy under gravity
+# fall, towards the highest platform it can still land on: one the jump's
+# apex clears and whose edge the ball can get over, at 5 px a step and going
+# round the wrap if that is shorter, by the time it has come back down to it.
+# It lands on the end nearest the platform above, for a head start on the
+# next jump. Heading for the highest platform the apex clears regardless of
+# distance can leave the ball bouncing forever between two platforms.
+def chase_move(pool, x, y, vy, fall, width, r, ph):
+    rects = pool.rects
+    wrap = width + 2 * r + 5  # x positions repeat with this period
+    v = vy + fall / 2  # speed changes before each move, so n steps cover n * v + fall * n * n / 2
+    apex = y - v * v / (2 * fall) if v < 0 else y
+    for slot in pool.index.between(apex - r, math.inf):
+        rect = rects[slot]
+        drop = v * v + 2 * fall * (rect.y + r - y)  # with the ball's top level with the platform's
+        if drop < 0:
+            continue
+        steps = (math.sqrt(drop) - v) / fall  # until the ball is back down there
+        dx = wrap_dx(rect.centerx - x, wrap)
+        if steps < 0 or abs(dx) - (rect.width // 2 + r - 5) > 5 * steps:  # ball overlapping it by 5 px
+            continue
+        above = pool.index.between(-math.inf, rect.y)
+        if above:
+            reach = rect.width // 2  # with the 10 px of slack below, still 5 px onto it
+            dx += max(-reach, min(reach, wrap_dx(rects[above[-1]].centerx - rect.centerx, wrap)))
+        if dx > 10:
+            return RIGHT
+        if dx < -10:
+            return LEFT
+        return 0
+    return 0
+
+
+def chase_policy(engine):
+    return chase_move(engine.pool, engine.ball_x, engine.ball_y - engine.view_offset(), engine.ball_speed_y,
+                      engine.gravity * engine.difficulty(), engine.width, engine.ball_radius, engine.ph)
+
+
+# chase_policy for every game in a batch
+def chase_batch(batch):
+    fall = batch.gravity * difficulty(batch.level)
+    y = batch.ball_y - batch.camera.astype(np.int64)
+    return [chase_move(pool, x, ty, vy, f, batch.width, batch.ball_radius, batch.ph)
+            for pool, x, ty, vy, f in zip(batch.pools, batch.ball_x.tolist(), y.tolist(),
+                                          batch.ball_speed_y.tolist(), fall.tolist())]
+
+
+# Step an engine as fast as possible, restarting whenever a game ends
+def run_batch(frames, policy=chase_policy, engine=None):
+    engine = engine or TowerEngine()
+    games = 1
+    best_level = engine.level
+    start = time.perf_counter()
+    for _ in range(frames):
+        engine.step(policy(engine))
+        best_level = max(best_level, engine.level)
+        if engine.game_over or engine.win:
+            engine.reset()
+            games += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else float("inf"),
+        "games": games,
+        "best_level": best_level,
+    }
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    stats = run_batch(frames)
+    print(f"{stats['frames']} frames in {stats['seconds']:.2f}s "
+          f"({stats['fps']:.0f} FPS), {stats['games']} games, best level {stats['best_level']}")
+    if stats["best_level"] == 1:
+        sys.exit("chase_policy never got past level 1")
@@ -1,15 +1,25 @@
+from asset_loader import AssetLoader, report_first_frame  # first, so start-up timing covers the rest
 import pygame
-import random
-import os
-import uuid
-import time
+import functools
+import numpy as np
+
+from tower_engine import TowerEngine, LEFT, RIGHT
+from text_cache import get_font, render_text
+from score_store import get_store
+from scenes import SceneManager, BACK
+from dirty_rects import DirtyRenderer
+from fixed_step import FixedTimestep, RENDER_FPS
+from replay import SeededRandom, open_recorder, session_seed
+from profiler import profiler
+from static_screens import EXPOSE_EVENTS, show, wait_events
+from particles import ParticleSystem
 
 pygame.init()
 
 # Window
 WIDTH, HEIGHT = 400, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Tower Jump")
+screen = None
+renderer = None
 
 # Colors
 WHITE = (255, 255, 255)
@@ -20,238 +30,274 @@ SKY = (135, 206, 250)
 BLACK = (0, 0, 0)
 GOLD = (255, 223, 0)
 
-# Font
-font = pygame.font.SysFont("Arial", 20)
-big_font = pygame.font.SysFont("Arial", 32)
-huge_font = pygame.font.SysFont("Arial", 40, bold=True)
-
 # Clock
 clock = pygame.time.Clock()
 FPS = 60
 
-# High score
-high_score_file = "highscore.txt"
-high_score = 0
-if os.path.exists(high_score_file):
-    with open(high_score_file, "r") as f:
-        try:
-            high_score = int(f.read())
-        except:
-            high_score = 0
-
-# Clouds
-clouds = []
-for _ in range(5):
-    side = random.choice(["left", "right"])
-    x = -random.randint(100, 400) if side == "left" else WIDTH + random.randint(100, 400)
-    y = random.randint(50, 300)
-    speed = random.uniform(0.2, 0.5)
-    clouds.append([x, y, side, speed])
-
-# Sparkles
-sparkles = [{"x": random.randint(0, WIDTH), "y": random.randint(0, HEIGHT), "dy": random.uniform(0.2, 0.6)} for _ in range(30)]
-
-def show_loading_screen():
+# Fonts, high scores and pre-rendered labels, loaded by load_assets()
+font = big_font = huge_font = None
+scores = None
+assets_loaded = False
+
+def load_fonts():
+    global font, big_font, huge_font
+    font = get_font("Arial", 20)
+    big_font = get_font("Arial", 32)
+    huge_font = get_font("Arial", 40, bold=True)
+
+def load_scores():
+    global scores
+    scores = get_store()
+
+def prerender_labels():
+    for label_font, text, color in (
+        (big_font, "Tower Jump", WHITE),
+        (font, "Press SPACE to Start", WHITE),
+        (font, "Press Q to Quit", WHITE),
+        (font, "Press Q to Quit", BLACK),
+        (font, "Press R to Restart", BLACK),
+        (big_font, "Game Over", (255, 0, 0)),
+        (font, "Press ENTER to open gate", BLACK),
+        (font, "⚠ Platforms disappear!", (200, 0, 0)),
+        (huge_font, "Welcome to Heaven", BLACK),
+        (big_font, "Tower King!", GOLD),
+    ):
+        render_text(label_font, text, color)
+
+ASSETS = [("fonts", load_fonts), ("high scores", load_scores), ("labels", prerender_labels)]
+
+# Clouds and sparkles, scattered afresh from each session's seed. Each kind
+# is drawn once onto a color-keyed sprite and then only blitted.
+CLOUDS = 5
+SPARKLES = 30
+KEY = (255, 0, 255)
+
+def make_sprite(size, draw):
+    sprite = pygame.Surface(size)
+    sprite.fill(KEY)
+    draw(sprite)
+    sprite.set_colorkey(KEY, pygame.RLEACCEL)
+    return sprite
+
+cloud_img = make_sprite((60, 30), lambda s: pygame.draw.ellipse(s, WHITE, s.get_rect()))
+sparkle_img = make_sprite((7, 7), lambda s: pygame.draw.circle(s, GOLD, (3, 3), 3))
+
+# Clouds drift sideways off one edge and come back on the other at a new
+# height; sparkles fall and come back in at the top
+clouds = ParticleSystem(cloud_img, (-100, 0, WIDTH, HEIGHT), lane_y=(50, 300))
+sparkles = ParticleSystem(sparkle_img, (0, 0, WIDTH, HEIGHT), origin=(-3, -3))
+
+def reset_effects(seed):
+    r = clouds.rng = sparkles.rng = np.random.default_rng(seed)
+    clouds.clear()
+    sparkles.clear()
+    left = r.random(CLOUDS) < 0.5
+    offset = r.integers(100, 401, CLOUDS)
+    speed = r.uniform(0.2, 0.5, CLOUDS)
+    clouds.emit(np.where(left, -offset, WIDTH + offset), r.integers(50, 301, CLOUDS),
+                np.where(left, speed, -speed), np.zeros(CLOUDS))
+    sparkles.emit(r.integers(0, WIDTH + 1, SPARKLES), r.integers(0, HEIGHT + 1, SPARKLES),
+                  np.zeros(SPARKLES), r.uniform(0.2, 0.6, SPARKLES))
+
+# Loads on a background thread, with a progress bar when loading_screen is
+# set. Returns False if the window was closed while loading.
+def load_assets(loading_screen=False):
+    global assets_loaded
+    if assets_loaded:
+        return True
+    loader = AssetLoader(ASSETS)
+    if loading_screen:
+        # pygame's bundled font is ready instantly; the main thread draws
+        # nothing but this label and rects while the loader renders text
+        txt = pygame.font.Font(None, 40).render("Loading...", True, WHITE)
+        loader.start()
+        if not show_loading_screen(loader, txt):
+            return False
+    else:
+        loader.start()
+    loader.wait()
+    assets_loaded = True
+    return True
+
+def show_loading_screen(loader, txt):
+    bar = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 + 30, 200, 12)
+    while not loader.ready:
+        clock.tick(FPS)
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT:
+                return False
+        screen.fill(BLACK)
+        screen.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 - 20))
+        pygame.draw.rect(screen, WHITE, bar, 1)
+        pygame.draw.rect(screen, WHITE, (bar.x, bar.y, int(bar.width * loader.progress), bar.height))
+        pygame.display.flip()
+    return True
+
+def draw_start_screen(screen):
     screen.fill(BLACK)
-    txt = big_font.render("Loading...", True, WHITE)
-    screen.blit(txt, (WIDTH//2 - txt.get_width()//2, HEIGHT//2 - 20))
-    pygame.display.flip()
-    time.sleep(2)
+    title = render_text(big_font, "Tower Jump", WHITE)
+    start_txt = render_text(font, "Press SPACE to Start", WHITE)
+    quit_txt = render_text(font, "Press Q to Quit", WHITE)
+    screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//2 - 50))
+    screen.blit(start_txt, (WIDTH//2 - start_txt.get_width()//2, HEIGHT//2 + 10))
+    screen.blit(quit_txt, (WIDTH//2 - quit_txt.get_width()//2, HEIGHT//2 + 35))
+
+# One frame of play, heaven included
+def draw_frame(engine, alpha, high_score, opened_gate):
+    score, level = engine.score, engine.level
+    game_over, win = engine.game_over, engine.win
+    heaven = win and opened_gate
+    ball_radius = engine.ball_radius
+
+    if heaven or level > 99:
+        renderer.begin(WHITE)
+    elif level > 50:
+        renderer.begin(SKY)
+    else:
+        renderer.begin(GRAY)
+
+    if level > 50 and not heaven:
+        for rect in clouds.draw(screen, alpha, renderer.enabled):
+            renderer.mark(rect)
+
+    if not heaven:
+        color = BROWN if level < 50 else LIGHT_BROWN
+        for plat in engine.visible_platforms(alpha):
+            renderer.mark(pygame.draw.rect(screen, color, plat))
+
+        renderer.mark(pygame.draw.circle(screen, (0, 0, 255), engine.ball_position(alpha), ball_radius))
+        profiler.lap("draw")
+
+        renderer.blit(render_text(font, f"Score: {score}", BLACK), (10, 10))
+        renderer.blit(render_text(font, f"Level: {level}", BLACK), (10, 30))
+        renderer.blit(render_text(font, f"High Score: {high_score}", BLACK), (10, 50))
+        if level >= 90 and not win:
+            renderer.blit(render_text(font, "⚠ Platforms disappear!", (200, 0, 0)), (10, 70))
+
+    if game_over:
+        game_over_txt = render_text(big_font, "Game Over", (255, 0, 0))
+        restart_txt = render_text(font, "Press R to Restart", BLACK)
+        quit_txt = render_text(font, "Press Q to Quit", BLACK)
+        renderer.blit(game_over_txt, (WIDTH // 2 - game_over_txt.get_width() // 2, HEIGHT // 2 - 40))
+        renderer.blit(restart_txt, (WIDTH // 2 - restart_txt.get_width() // 2, HEIGHT // 2 + 0))
+        renderer.blit(quit_txt, (WIDTH // 2 - quit_txt.get_width() // 2, HEIGHT // 2 + 25))
+
+    if win and not opened_gate:
+        renderer.mark(pygame.draw.rect(screen, (150, 75, 0), (WIDTH // 2 - 25, HEIGHT // 2 - 60, 50, 100)))
+        gate_txt = render_text(font, "Press ENTER to open gate", BLACK)
+        renderer.blit(gate_txt, (WIDTH // 2 - gate_txt.get_width() // 2, HEIGHT // 2 + 50))
+
+    if heaven:
+        for rect in sparkles.draw(screen, alpha, renderer.enabled):
+            renderer.mark(rect)
+
+        renderer.mark(pygame.draw.circle(screen, (0, 0, 255), (WIDTH // 2, HEIGHT // 2 - 20), ball_radius))
+        profiler.lap("draw")
+
+        welcome_txt = render_text(huge_font, "Welcome to Heaven", BLACK)
+        king_txt = render_text(big_font, "Tower King!", GOLD)
+        restart_txt = render_text(font, "Press R to Restart", BLACK)
+        quit_txt = render_text(font, "Press Q to Quit", BLACK)
+
+        renderer.blit(welcome_txt, (WIDTH // 2 - welcome_txt.get_width() // 2, HEIGHT // 2 + 10))
+        renderer.blit(king_txt, (WIDTH // 2 - king_txt.get_width() // 2, HEIGHT // 2 + 50))
+        renderer.blit(restart_txt, (WIDTH // 2 - restart_txt.get_width() // 2, HEIGHT // 2 + 90))
+        renderer.blit(quit_txt, (WIDTH // 2 - quit_txt.get_width() // 2, HEIGHT // 2 + 115))
+    profiler.lap("text")
+
+    profiler.draw(renderer.blit)
+    profiler.lap("profiler")
+    renderer.present()
+    profiler.lap("present")
 
 def game_loop():
-    ball_radius = 15
-    ball_x = WIDTH // 2
-    ball_y = HEIGHT - ball_radius
-    ball_speed_y = 0
-    gravity = 0.5
-    jump_power = -10
-
-    pw, ph = 80, 10
-    platforms = []
-    platform_ids = []
-    timers = []
-    VISIBLE_PLATFORM_LIMIT = 7
-
-    def spawn_platforms():
-        while len([p for p in platforms if p.width > 0 and p.y < HEIGHT]) < VISIBLE_PLATFORM_LIMIT:
-            max_attempts = 100
-            while max_attempts > 0:
-                x = random.randint(0, WIDTH - pw)
-                if platforms:
-                    min_y = min([p.y for p in platforms if p.width > 0])
-                    y = min_y - random.randint(60, 100)
-                else:
-                    y = HEIGHT - 60
-                too_close = any(abs(p.x - x) < pw and abs(p.y - y) < 20 for p in platforms)
-                if not too_close:
-                    platforms.append(pygame.Rect(x, y, pw, ph))
-                    platform_ids.append(str(uuid.uuid4()))
-                    timers.append(None)
-                    break
-                max_attempts -= 1
-
-    for _ in range(VISIBLE_PLATFORM_LIMIT):
-        spawn_platforms()
-
-    visited = set()
-    score = 0
-    level = 1
-    scroll = 0
+    seed = session_seed()
+    reset_effects(seed)
+    engine = TowerEngine(WIDTH, HEIGHT, rng=SeededRandom(seed))
+    recorder = open_recorder("tower_jump", seed, engine.keyframe, 2)
+    engine.profiler = profiler
+    timestep = FixedTimestep()
+    high_score = scores.get("tower_jump")
     running = True
-    game_over = False
-    win = False
     opened_gate = False
     show_start = True
-    has_touched = False
-
-    global clouds, sparkles
+    start_shown = False
+    score_saved = False
 
     while running:
-        clock.tick(FPS)
+        profiler.start_frame()
+        clock.tick(FPS if show_start else RENDER_FPS)
+        profiler.lap("wait")
         keys = pygame.key.get_pressed()
-
-        for e in pygame.event.get():
+        game_over, win = engine.game_over, engine.win
+
+        # the start screen sleeps until a key arrives
+        for e in wait_events() if show_start and start_shown else pygame.event.get():
+            if profiler.handle(e):
+                continue
+            if e.type in EXPOSE_EVENTS:
+                start_shown = False
             if e.type == pygame.QUIT:
-                return False
+                recorder.close(engine.summary())
+                return None
             if show_start and e.type == pygame.KEYDOWN and e.key == pygame.K_SPACE:
                 show_start = False
             if (game_over or (win and opened_gate)) and e.type == pygame.KEYDOWN:
                 if e.key == pygame.K_r: return True
-                if e.key == pygame.K_q: return False
+                if e.key == pygame.K_q: return BACK
             if win and not opened_gate and e.type == pygame.KEYDOWN and e.key == pygame.K_RETURN:
                 opened_gate = True
+        profiler.lap("events")
 
         if show_start:
-            screen.fill(BLACK)
-            title = big_font.render("Tower Jump", True, WHITE)
-            start_txt = font.render("Press SPACE to Start", True, WHITE)
-            quit_txt = font.render("Press Q to Quit", True, WHITE)
-            screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//2 - 50))
-            screen.blit(start_txt, (WIDTH//2 - start_txt.get_width()//2, HEIGHT//2 + 10))
-            screen.blit(quit_txt, (WIDTH//2 - quit_txt.get_width()//2, HEIGHT//2 + 35))
-            pygame.display.flip()
+            if not start_shown:
+                show(screen, "tower_jump_start", draw_start_screen)
+                renderer.invalidate()
+                start_shown = True
+                report_first_frame()
+            timestep.reset()
             continue
 
-        if level <= 50:
-            screen.fill(GRAY)
-        elif level <= 99:
-            screen.fill(SKY)
-        else:
-            screen.fill(WHITE)
-
-        if level > 50:
-            for cloud in clouds:
-                x, y, side, s = cloud
-                pygame.draw.ellipse(screen, WHITE, (x, y, 60, 30))
-                cloud[0] += s if side == "left" else -s
-                if side == "left" and cloud[0] > WIDTH:
-                    cloud[0], cloud[1] = -100, random.randint(50, 300)
-                if side == "right" and cloud[0] < -100:
-                    cloud[0], cloud[1] = WIDTH + 100, random.randint(50, 300)
-
-        if not win:
-            if keys[pygame.K_LEFT]: ball_x -= 5
-            if keys[pygame.K_RIGHT]: ball_x += 5
-            if ball_x < -ball_radius: ball_x = WIDTH + ball_radius
-            if ball_x > WIDTH + ball_radius: ball_x = -ball_radius
-
-        if not win:
-            ball_speed_y += gravity * (1 + ((level - 1) // 10) * 0.1)
-            ball_y += ball_speed_y
-
-        if ball_y >= HEIGHT - ball_radius:
-            if has_touched:
-                game_over = True
-            else:
-                ball_y = HEIGHT - ball_radius
-                ball_speed_y = jump_power
-
-        if ball_y < HEIGHT // 3 and ball_speed_y < 0:
-            scroll = HEIGHT // 3 - ball_y
-            ball_y = HEIGHT // 3
-            for i in range(len(platforms)):
-                platforms[i].y += scroll
-        else:
-            scroll = 0
-
-        ball_rect = pygame.Rect(ball_x - ball_radius, ball_y - ball_radius, ball_radius * 2, ball_radius * 2)
-
-        for i, plat in enumerate(platforms):
-            if plat.colliderect(ball_rect) and ball_speed_y > 0:
-                ball_speed_y = jump_power * (1 + ((level - 1) // 10) * 0.1)
-                has_touched = True
-                pid = platform_ids[i]
-                if pid not in visited:
-                    visited.add(pid)
-                    score += 10
-                    if score // 100 + 1 > level:
-                        level += 1
-                        if level == 100: win = True
-                if level >= 90 and timers[i] is None:
-                    timers[i] = pygame.time.get_ticks()
-
-        for i, plat in enumerate(platforms):
-            if level >= 90 and timers[i] is not None:
-                if pygame.time.get_ticks() - timers[i] > 1000:
-                    platforms[i] = pygame.Rect(-100, -100, 0, 0)
-                    timers[i] = None
-            if platforms[i].width > 0:
-                color = BROWN if level < 50 else LIGHT_BROWN
-                pygame.draw.rect(screen, color, plat)
-
-        spawn_platforms()
-
-        pygame.draw.circle(screen, (0, 0, 255), (ball_x, int(ball_y)), ball_radius)
-
-        screen.blit(font.render(f"Score: {score}", True, BLACK), (10, 10))
-        screen.blit(font.render(f"Level: {level}", True, BLACK), (10, 30))
-        screen.blit(font.render(f"High Score: {high_score}", True, BLACK), (10, 50))
-        if level >= 90 and not win:
-            screen.blit(font.render("⚠ Platforms disappear!", True, (200, 0, 0)), (10, 70))
-
-        if game_over:
-            game_over_txt = big_font.render("Game Over", True, (255, 0, 0))
-            restart_txt = font.render("Press R to Restart", True, BLACK)
-            quit_txt = font.render("Press Q to Quit", True, BLACK)
-            screen.blit(game_over_txt, (WIDTH // 2 - game_over_txt.get_width() // 2, HEIGHT // 2 - 40))
-            screen.blit(restart_txt, (WIDTH // 2 - restart_txt.get_width() // 2, HEIGHT // 2 + 0))
-            screen.blit(quit_txt, (WIDTH // 2 - quit_txt.get_width() // 2, HEIGHT // 2 + 25))
-
-        if win and not opened_gate:
-            pygame.draw.rect(screen, (150, 75, 0), (WIDTH // 2 - 25, HEIGHT // 2 - 60, 50, 100))
-            gate_txt = font.render("Press ENTER to open gate", True, BLACK)
-            screen.blit(gate_txt, (WIDTH // 2 - gate_txt.get_width() // 2, HEIGHT // 2 + 50))
-
-        if win and opened_gate:
-            screen.fill(WHITE)
-            for sparkle in sparkles:
-                pygame.draw.circle(screen, GOLD, (int(sparkle["x"]), int(sparkle["y"])), 3)
-                sparkle["y"] += sparkle["dy"]
-                if sparkle["y"] > HEIGHT:
-                    sparkle["y"], sparkle["x"] = 0, random.randint(0, WIDTH)
-
-            pygame.draw.circle(screen, (0, 0, 255), (WIDTH // 2, HEIGHT // 2 - 20), ball_radius)
-
-            welcome_txt = huge_font.render("Welcome to Heaven", True, BLACK)
-            king_txt = big_font.render("Tower King!", True, GOLD)
-            restart_txt = font.render("Press R to Restart", True, BLACK)
-            quit_txt = font.render("Press Q to Quit", True, BLACK)
-
-            screen.blit(welcome_txt, (WIDTH // 2 - welcome_txt.get_width() // 2, HEIGHT // 2 + 10))
-            screen.blit(king_txt, (WIDTH // 2 - king_txt.get_width() // 2, HEIGHT // 2 + 50))
-            screen.blit(restart_txt, (WIDTH // 2 - restart_txt.get_width() // 2, HEIGHT // 2 + 90))
-            screen.blit(quit_txt, (WIDTH // 2 - quit_txt.get_width() // 2, HEIGHT // 2 + 115))
-
-        pygame.display.flip()
-
-        if (game_over or (win and opened_gate)) and score > high_score:
-            with open(high_score_file, "w") as f:
-                f.write(str(score))
-
-    return False
+        inputs = 0
+        if keys[pygame.K_LEFT]: inputs |= LEFT
+        if keys[pygame.K_RIGHT]: inputs |= RIGHT
+        heaven = win and opened_gate
+        for _ in range(timestep.steps()):
+            recorder.record(inputs)
+            engine.step(inputs)
+            if engine.game_over or engine.win:
+                recorder.close(engine.summary())  # later steps just animate the ending
+            if engine.level > 50 and not heaven:
+                clouds.update()
+            if heaven:
+                sparkles.update()
+            profiler.lap("update")
+        draw_frame(engine, timestep.alpha, high_score, opened_gate)
+        profiler.end_frame()
+        score = engine.score
+        game_over, win = engine.game_over, engine.win
+
+        if (game_over or (win and opened_gate)) and not score_saved:
+            scores.submit("tower_jump", score)
+            score_saved = True
+
+    return BACK
+
+# Scene entry point: plays until the player quits, restarting on R
+def run(surface, loading_screen=False):
+    global screen, renderer
+    screen = surface
+    renderer = DirtyRenderer(surface)
+    if not load_assets(loading_screen):
+        return None
+    result = game_loop()
+    while result is True:
+        result = game_loop()
+    return result
 
 # Main
-show_loading_screen()
-while game_loop():
-    pass
-pygame.quit()
+if __name__ == "__main__":
+    manager = SceneManager()
+    manager.register("tower_jump_1p", functools.partial(run, loading_screen=True), (WIDTH, HEIGHT), "Tower Jump")
+    manager.run("tower_jump_1p")
+    pygame.quit()
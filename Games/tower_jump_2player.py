@@ -1,15 +1,31 @@
 import pygame
-import random
 import os
-import uuid
-import time
+
+import numpy as np
+
+from tower_engine import TowerBatch, LEFT, RIGHT
+from text_cache import get_font, render_text
+from score_store import get_store
+from scenes import SceneManager, BACK
+from fixed_step import FixedTimestep, RENDER_FPS
+from replay import open_recorder, session_seed
+from profiler import profiler
+from static_screens import EXPOSE_EVENTS, show, wait_events
 
 pygame.init()
-pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP])
 
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Tower Jump - Two Player")
+screen = None
+
+# Split screen for 2-8 players. GAMES_PLAYERS sets how many; GAMES_KEYS sets
+# their controls as left,right key-name pairs separated by semicolons, e.g.
+# "a,d;left,right;j,l", and anyone without a pair gets the default below.
+PLAYERS = int(os.environ.get("GAMES_PLAYERS", "2"))
+MIN_PLAYERS, MAX_PLAYERS = 2, 8
+COLUMNS = 4  # most viewports per row
+FIELD_WIDTH, FIELD_HEIGHT = 400, 600  # every player's play field, however many are playing
+DEFAULT_KEYS = [("a", "d"), ("left", "right"), ("j", "l"), ("[4]", "[6]"),
+                ("z", "c"), ("v", "n"), ("u", "o"), ("[1]", "[3]")]
 
 WHITE = (255, 255, 255)
 GRAY = (50, 50, 50)
@@ -19,206 +35,226 @@ SKY = (135, 206, 250)
 BLACK = (0, 0, 0)
 GOLD = (255, 223, 0)
 
-font = pygame.font.SysFont("Arial", 20)
-big_font = pygame.font.SysFont("Arial", 32)
-huge_font = pygame.font.SysFont("Arial", 40, bold=True)
+font = get_font("Arial", 20)
+big_font = get_font("Arial", 32)
+huge_font = get_font("Arial", 40, bold=True)
 
 clock = pygame.time.Clock()
 FPS = 60
 
-score_files = {
-    "Player 1": "highscore_player1.txt",
-    "Player 2": "highscore_player2.txt"
-}
+scores = get_store()
 
 def load_high_score(name):
-    try:
-        with open(score_files[name], 'r') as f:
-            return int(f.read())
-    except:
-        return 0
+    return scores.get("tower_jump_2p", name)
 
 def save_high_score(name, score):
-    with open(score_files[name], 'w') as f:
-        f.write(str(score))
+    scores.submit("tower_jump_2p", score, name)
 
 def get_overall_high_score():
-    scores = [load_high_score("Player 1"), load_high_score("Player 2")]
-    return max(scores)
-
+    return scores.best("tower_jump_2p")
+
+def key_bindings(count, spec=os.environ.get("GAMES_KEYS", "")):
+    pairs = [pair.split(",") for pair in spec.split(";") if pair.strip()]
+    bindings = []
+    for i in range(count):
+        left, right = pairs[i] if i < len(pairs) else DEFAULT_KEYS[i]
+        bindings.append((pygame.key.key_code(left.strip()), pygame.key.key_code(right.strip())))
+    return bindings
+
+# One viewport per player, in the grid of up to COLUMNS columns that shows
+# the play field biggest, centered on the screen. Every viewport has the
+# field's shape, shrunk to fit when needed (to half size for 4 or more).
+def layout(count):
+    best = None
+    for cols in range(1, min(count, COLUMNS) + 1):
+        rows = -(-count // cols)
+        scale = min(1, WIDTH / cols / FIELD_WIDTH, HEIGHT / rows / FIELD_HEIGHT)
+        if best is None or scale > best[0]:
+            best = scale, cols, rows
+    scale, cols, rows = best
+    w, h = int(FIELD_WIDTH * scale), int(FIELD_HEIGHT * scale)
+    left, top = (WIDTH - cols * w) // 2, (HEIGHT - rows * h) // 2
+    return [pygame.Rect(left + i % cols * w, top + i // cols * h, w, h) for i in range(count)]
+
+# A player's name, keys and viewport. The game itself is row `index` of the
+# shared TowerBatch, which steps every player at once.
 class Player:
-    def __init__(self, name, x_offset, left_key, right_key):
+    def __init__(self, index, name, left_key, right_key, viewport):
+        self.index = index
         self.name = name
-        self.offset = x_offset
         self.left_key = left_key
         self.right_key = right_key
+        self.viewport = viewport
+        self.surface = screen.subsurface(viewport)
+        self.scale = viewport.width / FIELD_WIDTH  # field to viewport
         self.high_score = load_high_score(name)
-        self.reset()
-
-    def reset(self):
-        self.ball_radius = 15
-        self.ball_x = self.offset + 200
-        self.ball_y = HEIGHT - self.ball_radius
-        self.ball_speed_y = 0
-        self.gravity = 0.5
-        self.jump_power = -10
-        self.score = 0
-        self.level = 1
-        self.has_touched = False
-        self.win = False
-        self.opened_gate = False
-        self.game_over = False
-        self.visited = set()
-        self.scroll = 0
-
-        self.platforms = []
-        self.platform_ids = []
-        self.timers = []
-        for _ in range(7):
-            self.spawn_platform()
-
-    def spawn_platform(self):
-        pw, ph = 80, 10
-        while True:
-            x = random.randint(0, 400 - pw)
-            y = HEIGHT - 60 if not self.platforms else min(p.y for p in self.platforms) - random.randint(60, 100)
-            too_close = any(abs(p.x - x) < pw and abs(p.y - y) < 20 for p in self.platforms)
-            if not too_close:
-                self.platforms.append(pygame.Rect(x + self.offset, y, pw, ph))
-                self.platform_ids.append(str(uuid.uuid4()))
-                self.timers.append(None)
-                break
-
-    def update(self, keys):
-        if self.win:
-            return
-
-        if keys[self.left_key]:
-            self.ball_x -= 5
-        if keys[self.right_key]:
-            self.ball_x += 5
-        if self.ball_x < self.offset - self.ball_radius:
-            self.ball_x = self.offset + 400 + self.ball_radius
-        if self.ball_x > self.offset + 400 + self.ball_radius:
-            self.ball_x = self.offset - self.ball_radius
-
-        self.ball_speed_y += self.gravity * (1 + ((self.level - 1) // 10) * 0.1)
-        self.ball_y += self.ball_speed_y
-
-        if self.ball_y >= HEIGHT - self.ball_radius:
-            if self.has_touched:
-                self.game_over = True
-            else:
-                self.ball_y = HEIGHT - self.ball_radius
-                self.ball_speed_y = self.jump_power
-
-        if self.ball_y < HEIGHT // 3 and self.ball_speed_y < 0:
-            self.scroll = HEIGHT // 3 - self.ball_y
-            self.ball_y = HEIGHT // 3
-            for i in range(len(self.platforms)):
-                self.platforms[i].y += self.scroll
-        else:
-            self.scroll = 0
-
-        ball_rect = pygame.Rect(self.ball_x - self.ball_radius, self.ball_y - self.ball_radius, self.ball_radius * 2, self.ball_radius * 2)
-
-        for i, plat in enumerate(self.platforms):
-            if plat.colliderect(ball_rect) and self.ball_speed_y > 0:
-                self.ball_speed_y = self.jump_power * (1 + ((self.level - 1) // 10) * 0.1)
-                self.has_touched = True
-                pid = self.platform_ids[i]
-                if pid not in self.visited:
-                    self.visited.add(pid)
-                    self.score += 10
-                    if self.score // 100 + 1 > self.level:
-                        self.level += 1
-                        if self.level == 100:
-                            self.win = True
-                if self.level >= 90 and self.timers[i] is None:
-                    self.timers[i] = pygame.time.get_ticks()
-
-        for i in range(len(self.platforms)):
-            if self.level >= 90 and self.timers[i] is not None:
-                if pygame.time.get_ticks() - self.timers[i] > 1000:
-                    self.platforms[i] = pygame.Rect(-100, -100, 0, 0)
-                    self.timers[i] = None
-
-        while len([p for p in self.platforms if p.width > 0 and p.y < HEIGHT]) < 7:
-            self.spawn_platform()
-
-        if (self.game_over or self.win) and self.score > self.high_score:
-            self.high_score = self.score
-            save_high_score(self.name, self.score)
-
-    def draw(self):
-        color = BROWN if self.level < 50 else LIGHT_BROWN
-        for plat in self.platforms:
-            if plat.width > 0:
-                pygame.draw.rect(screen, color, plat)
-        pygame.draw.circle(screen, (0, 0, 255), (int(self.ball_x), int(self.ball_y)), self.ball_radius)
-        screen.blit(font.render(f"{self.name} Score: {self.score}", True, BLACK), (self.offset + 10, 10))
-        screen.blit(font.render(f"Level: {self.level}", True, BLACK), (self.offset + 10, 30))
-        screen.blit(font.render(f"High: {self.high_score}", True, BLACK), (self.offset + 10, 50))
-        if self.level >= 90 and not self.win:
-            screen.blit(font.render("⚠ Platforms disappear!", True, (200, 0, 0)), (self.offset + 10, 70))
-        if self.game_over:
-            go_text = big_font.render("Game Over", True, (255, 0, 0))
-            r_text = font.render("Press R to Restart", True, BLACK)
-            q_text = font.render("Press Q to Quit", True, BLACK)
-            screen.blit(go_text, (self.offset + 200 - go_text.get_width() // 2, HEIGHT // 2 - 40))
-            screen.blit(r_text, (self.offset + 200 - r_text.get_width() // 2, HEIGHT // 2 + 0))
-            screen.blit(q_text, (self.offset + 200 - q_text.get_width() // 2, HEIGHT // 2 + 30))
-        if self.win:
-            win_text = big_font.render("YOU WIN", True, GOLD)
-            r_text = font.render("Press R to Restart", True, BLACK)
-            q_text = font.render("Press Q to Quit", True, BLACK)
-            screen.blit(win_text, (self.offset + 200 - win_text.get_width() // 2, HEIGHT // 2 - 40))
-            screen.blit(r_text, (self.offset + 200 - r_text.get_width() // 2, HEIGHT // 2 + 0))
-            screen.blit(q_text, (self.offset + 200 - q_text.get_width() // 2, HEIGHT // 2 + 30))
-
-players = [
-    Player("Player 1", 0, pygame.K_a, pygame.K_d),
-    Player("Player 2", 400, pygame.K_LEFT, pygame.K_RIGHT)
-]
+
+    def inputs(self, keys):
+        inputs = 0
+        if keys[self.left_key]: inputs |= LEFT
+        if keys[self.right_key]: inputs |= RIGHT
+        return inputs
+
+    def draw(self, alpha=1.0):
+        i, surface = self.index, self.surface
+        w, h = self.viewport.size
+        score, level = int(batch.score[i]), int(batch.level[i])
+        game_over, win = batch.game_over[i], batch.win[i]
+        if game_over or win:
+            alpha = 1.0  # no longer stepping, so there is nothing to interpolate
+        color = BROWN if level < 50 else LIGHT_BROWN
+        # a shrunk viewport draws the field's shapes scaled rather than
+        # scaling a full-size render, which would cost ~1 ms a player
+        s = self.scale
+        for plat in batch.visible_platforms(i, alpha):
+            if s != 1:
+                plat = pygame.Rect(round(plat.x * s), round(plat.y * s), round(plat.w * s), round(plat.h * s))
+            pygame.draw.rect(surface, color, plat)
+        x, y = batch.ball_position(i, alpha)
+        pygame.draw.circle(surface, (0, 0, 255), (round(x * s), round(y * s)), round(batch.ball_radius * s))
+        profiler.lap("draw")
+        surface.blit(render_text(font, f"{self.name} Score: {score}", BLACK), (10, 10))
+        surface.blit(render_text(font, f"Level: {level}", BLACK), (10, 30))
+        surface.blit(render_text(font, f"High: {self.high_score}", BLACK), (10, 50))
+        if level >= 90 and not win:
+            surface.blit(render_text(font, "⚠ Platforms disappear!", (200, 0, 0)), (10, 70))
+        if game_over or win:
+            title = render_text(big_font, "YOU WIN", GOLD) if win else render_text(big_font, "Game Over", (255, 0, 0))
+            r_text = render_text(font, "Press R to Restart", BLACK)
+            q_text = render_text(font, "Press Q to Quit", BLACK)
+            surface.blit(title, (w // 2 - title.get_width() // 2, h // 2 - 40))
+            surface.blit(r_text, (w // 2 - r_text.get_width() // 2, h // 2 + 0))
+            surface.blit(q_text, (w // 2 - q_text.get_width() // 2, h // 2 + 30))
+        profiler.lap("text")
+
+players = []
+batch = None
+
+# Sets up count players (clamped to 2-8) on the current screen
+def configure(count=PLAYERS, bindings=None):
+    global batch
+    count = max(MIN_PLAYERS, min(count, MAX_PLAYERS))
+    bindings = bindings or key_bindings(count)
+    viewports = layout(count)
+    batch = TowerBatch(count, FIELD_WIDTH, FIELD_HEIGHT)
+    batch.profiler = profiler
+    players[:] = [Player(i, f"Player {i + 1}", *bindings[i], viewports[i]) for i in range(count)]
+
+def draw_start_screen(screen):
+    screen.fill(BLACK)
+    title = render_text(big_font, f"Tower Jump - {len(players)}P", WHITE)
+    screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//2 - 70 - 10 * len(players)))
+    screen.blit(render_text(font, "Press SPACE to Start", WHITE), (WIDTH//2 - 90, HEIGHT//2 + 0))
+    screen.blit(render_text(font, "Press Q to Quit", WHITE), (WIDTH//2 - 70, HEIGHT//2 + 30))
+    for i, player in enumerate(players):
+        keys = f"{player.name}: {pygame.key.name(player.left_key)} / {pygame.key.name(player.right_key)}"
+        screen.blit(render_text(font, keys, WHITE), (WIDTH//2 - 90, HEIGHT//2 + 70 + 22 * i))
+
+def draw_frame(alpha):
+    screen.fill(GRAY)
+    for player in players:
+        player.draw(alpha)
+    origin = players[0].viewport  # top left of the grid
+    for player in players:
+        viewport = player.viewport
+        if viewport.left > origin.left:
+            pygame.draw.line(screen, BLACK, viewport.topleft, viewport.bottomleft, 2)
+        if viewport.top > origin.top:
+            pygame.draw.line(screen, BLACK, viewport.topleft, viewport.topright, 2)
+
+    top_score = get_overall_high_score()
+    screen.blit(render_text(font, f"Top Score: {top_score}", GOLD), (WIDTH // 2 - 70, HEIGHT - 30))
+    profiler.lap("text")
+
+    profiler.draw(screen.blit)
+    profiler.lap("profiler")
+    pygame.display.flip()
+    profiler.lap("present")
+
+# Every player climbs the same tower, from one seed
+def start_session():
+    seed = session_seed()
+    batch.reset(seed)
+    return open_recorder("tower_jump_2p", seed, batch.keyframe, 2 * len(players),
+                         players=len(players), field=[batch.width, batch.height])
+
+def summary():
+    return batch.summary()
+
+# Saves the score of every player whose game just ended on a new best
+def save_high_scores():
+    ended = np.flatnonzero((batch.game_over | batch.win) & (batch.score > [p.high_score for p in players]))
+    for i in ended.tolist():
+        player = players[i]
+        player.high_score = int(batch.score[i])
+        save_high_score(player.name, player.high_score)
 
 def game_loop():
     show_start = True
+    start_shown = False
+    timestep = FixedTimestep()
+    recorder = start_session()
+    start_key = ("tower_jump_2p_start", tuple((p.left_key, p.right_key) for p in players))
     while True:
-        clock.tick(FPS)
+        profiler.start_frame()
+        clock.tick(FPS if show_start else RENDER_FPS)
+        profiler.lap("wait")
         keys = pygame.key.get_pressed()
-        for event in pygame.event.get():
+        # the start screen sleeps until a key arrives
+        for event in wait_events() if show_start and start_shown else pygame.event.get():
+            if profiler.handle(event):
+                continue
+            if event.type in EXPOSE_EVENTS:
+                start_shown = False
             if event.type == pygame.QUIT:
-                return
+                recorder.close(summary())
+                return None
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_q:
-                    return
+                    recorder.close(summary())
+                    return BACK
                 if show_start and event.key == pygame.K_SPACE:
                     show_start = False
                 if event.key == pygame.K_r:
-                    for player in players:
-                        player.reset()
+                    recorder.close(summary())
+                    recorder = start_session()
                     show_start = True
+                    start_shown = False
+        profiler.lap("events")
 
         if show_start:
-            screen.fill(BLACK)
-            screen.blit(big_font.render("Tower Jump - 2P", True, WHITE), (WIDTH//2 - 100, HEIGHT//2 - 70))
-            screen.blit(font.render("Press SPACE to Start", True, WHITE), (WIDTH//2 - 90, HEIGHT//2 + 0))
-            screen.blit(font.render("Press Q to Quit", True, WHITE), (WIDTH//2 - 70, HEIGHT//2 + 30))
-            pygame.display.flip()
+            if not start_shown:
+                show(screen, start_key, draw_start_screen)
+                start_shown = True
+            timestep.reset()
             continue
 
-        screen.fill(GRAY)
-        pygame.draw.line(screen, BLACK, (WIDTH // 2, 0), (WIDTH // 2, HEIGHT), 2)
-
-        for player in players:
-            if not player.game_over and not player.win:
-                player.update(keys)
-            player.draw()
-
-        top_score = get_overall_high_score()
-        screen.blit(font.render(f"Top Score: {top_score}", True, GOLD), (WIDTH // 2 - 70, HEIGHT - 30))
-
-        pygame.display.flip()
-
-game_loop()
-pygame.quit()
+        # two input bits per player, player 1 lowest, as recorded in replays
+        masks = [player.inputs(keys) for player in players]
+        packed = sum(inputs << (2 * i) for i, inputs in enumerate(masks))
+        for _ in range(timestep.steps()):
+            recorder.record(packed)
+            batch.step(masks)
+            if (batch.game_over | batch.win).all():
+                recorder.close(summary())
+            profiler.lap("update")
+        save_high_scores()
+        draw_frame(timestep.alpha)
+        profiler.end_frame()
+
+# Scene entry point
+def run(surface):
+    global screen
+    screen = surface
+    pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, *EXPOSE_EVENTS])
+    configure()
+    try:
+        return game_loop()
+    finally:
+        pygame.event.set_allowed(None)
+
+if __name__ == "__main__":
+    manager = SceneManager()
+    manager.register("tower_jump_2p", run, (WIDTH, HEIGHT), f"Tower Jump - {PLAYERS} Players")
+    manager.run("tower_jump_2p")
+    pygame.quit()
@@ -1,67 +1,83 @@
 import pygame
-import sys
-import subprocess
+
+from text_cache import get_font, render_text
+from scenes import SceneManager, BACK
+from static_screens import EXPOSE_EVENTS, show, wait_events
 
 pygame.init()
 
 WIDTH, HEIGHT = 500, 400
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Tower Jump - Main Menu")
-clock = pygame.time.Clock()
-FPS = 60
+screen = None
 
 WHITE = (255, 255, 255)
 GRAY = (30, 30, 30)
 BLUE = (0, 120, 255)
 LIGHT_BLUE = (100, 170, 255)
 
-font = pygame.font.SysFont("Arial", 40)
-button_font = pygame.font.SysFont("Arial", 28)
+font = get_font("Arial", 40)
+button_font = get_font("Arial", 28)
 
 buttons = [
-    {"label": "1 Player", "rect": pygame.Rect(150, 120, 200, 50)},
-    {"label": "2 Player", "rect": pygame.Rect(150, 190, 200, 50)},
-    {"label": "Quit", "rect": pygame.Rect(150, 260, 200, 50)},
+    {"label": "1 Player", "rect": pygame.Rect(150, 120, 200, 50), "scene": "tower_jump_1p"},
+    {"label": "2 Player", "rect": pygame.Rect(150, 190, 200, 50), "scene": "tower_jump_2p"},
+    {"label": "Quit", "rect": pygame.Rect(150, 260, 200, 50), "scene": BACK},
 ]
 
-def draw_buttons(mouse_pos):
+def draw_buttons(screen, hovered):
     screen.fill(GRAY)
-    title = font.render("Tower Jump", True, WHITE)
+    title = render_text(font, "Tower Jump", WHITE)
     screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 40))
 
-    for button in buttons:
-        color = LIGHT_BLUE if button["rect"].collidepoint(mouse_pos) else BLUE
+    for i, button in enumerate(buttons):
+        color = LIGHT_BLUE if i == hovered else BLUE
         pygame.draw.rect(screen, color, button["rect"], border_radius=10)
-        label = button_font.render(button["label"], True, WHITE)
+        label = render_text(button_font, button["label"], WHITE)
         screen.blit(label, (
             button["rect"].x + (button["rect"].width - label.get_width()) // 2,
             button["rect"].y + (button["rect"].height - label.get_height()) // 2
         ))
 
-    pygame.display.flip()
+def hovered_button(pos):
+    for i, button in enumerate(buttons):
+        if button["rect"].collidepoint(pos):
+            return i
+    return None
 
+# Sleeps between events and redraws only when the hovered button changes
 def main_menu():
-    running = True
-    while running:
-        mouse_pos = pygame.mouse.get_pos()
-        draw_buttons(mouse_pos)
+    hovered = hovered_button(pygame.mouse.get_pos())
+    redraw = True
+    while True:
+        if redraw:
+            show(screen, ("tower_jump_menu", hovered), lambda target: draw_buttons(target, hovered))
+            redraw = False
 
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                return None
+
+            elif event.type in EXPOSE_EVENTS:
+                redraw = True
+
+            elif event.type == pygame.MOUSEMOTION:
+                now_hovered = hovered_button(event.pos)
+                if now_hovered != hovered:
+                    hovered = now_hovered
+                    redraw = True
 
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 for button in buttons:
                     if button["rect"].collidepoint(event.pos):
-                        if button["label"] == "1 Player":
-                            subprocess.run(["python", "tower_jump_1player.py"])
-                        elif button["label"] == "2 Player":
-                            subprocess.run(["python", "tower_jump_2player.py"])
-                        elif button["label"] == "Quit":
-                            pygame.quit()
-                            sys.exit()
+                        return button["scene"]
 
-        clock.tick(FPS)
+# Scene entry point: returns the game picked from the menu
+def run(surface):
+    global screen
+    screen = surface
+    return main_menu()
 
-main_menu()
+if __name__ == "__main__":
+    manager = SceneManager()
+    manager.register("tower_jump_menu", run, (WIDTH, HEIGHT), "Tower Jump - Main Menu")
+    manager.run("tower_jump_menu")
+    pygame.quit()
@@ -0,0 +1,509 @@
+import argparse
+import asyncio
+import collections
+import random
+import socket
+import struct
+import sys
+import time
+
+import pygame
+
+import tower_jump_2player as split
+from fixed_step import STEP_RATE, FixedTimestep, lerp
+from replay import session_seed
+from tower_engine import GAME_OVER, TOUCHED, WIN, TowerBatch, TowerEngine, lerp_x
+
+# Tower Jump over the network. The server is authoritative: it owns a
+# TowerBatch with one game per seat, all climbing the tower from one seed, and
+# steps it at a fixed STEP_RATE. Clients send one input per step; the server
+# applies each seat's inputs in order, one per tick, so a seat whose inputs
+# are late waits rather than guessing. Every SNAPSHOT_EVERY ticks each client
+# gets the state of the seats it shows, as a delta against the previous
+# snapshot. Messages go over TCP, so every snapshot arrives, in order, and
+# that delta is always against what the client already has.
+PORT = 5757
+MAX_SEATS = 32
+SNAPSHOT_EVERY = 2  # ticks between snapshots
+INPUT_BACKLOG = 3  # queued inputs past which a seat gets extra steps to catch up
+
+HELLO, WELCOME, INPUT, SNAPSHOT, BYE = range(1, 6)
+
+FRAME = struct.Struct("<H")  # length prefix of every message
+WELCOME_MSG = struct.Struct("<BBBBBHHI")  # type, seat, seats, step rate, snapshot every, field w, h, seed
+INPUT_MSG = struct.Struct("<BIB")  # type, sequence number, LEFT/RIGHT mask
+SNAPSHOT_HEAD = struct.Struct("<BIIB")  # type, tick, last input applied for the receiver's seat, chunks
+CHUNK_HEAD = struct.Struct("<BBBB")  # seat, changed fields, platforms added or changed, removed
+PLATFORM = struct.Struct("<IhiBI")  # id, x, y, visited, vanish frame (0 if none)
+
+# A seat's state is (fields, platforms): the fields below, in the order of
+# TowerEngine.state_fields(), and its platforms as {id: (x, y, visited,
+# vanish frame)}. Each chunk of a snapshot has a bit per field and carries
+# only the fields that changed.
+FIELDS = "hdddIIBB"  # ball x, ball y, ball speed y, camera, frame, score, level, flags
+FIELD_STRUCTS = [struct.Struct("<" + "".join(f for bit, f in enumerate(FIELDS) if mask >> bit & 1))
+                 for mask in range(1 << len(FIELDS))]
+EMPTY = ((None,) * len(FIELDS), {})  # baseline for a seat the client has never seen
+
+
+# The seats a client shows: its own first, then the next ones round the table
+def view_seats(seat, seats):
+    return [(seat + k) % seats for k in range(min(seats, split.MAX_PLAYERS))]
+
+
+def platform_states(pool):
+    rects, ids, visited, timers = pool.rects, pool.ids, pool.visited, pool.timers
+    return {ids[s]: (rects[s].x, rects[s].y, visited[s], timers[s][0] if timers[s] else 0) for s in pool.active}
+
+
+def batch_states(batch):
+    flags = batch.game_over * GAME_OVER + batch.win * WIN + batch.has_touched * TOUCHED
+    columns = zip(batch.ball_x.tolist(), batch.ball_y.tolist(), batch.ball_speed_y.tolist(), batch.camera.tolist(),
+                  batch.frame.tolist(), batch.score.tolist(), batch.level.tolist(), flags.tolist())
+    return [(fields, platform_states(pool)) for fields, pool in zip(columns, batch.pools)]
+
+
+# Puts an engine in a seat's state, platforms and vanish timers included
+def load_state(engine, state):
+    fields, platforms = state
+    engine.load(fields, [(pid, *platform) for pid, platform in platforms.items()])
+
+
+# One seat's changes from old to new, or b"" if there are none
+def encode_delta(seat, old, new):
+    (old_fields, old_platforms), (fields, platforms) = old, new
+    mask = 0
+    changed = []
+    for bit, (a, b) in enumerate(zip(old_fields, fields)):
+        if a != b:
+            mask |= 1 << bit
+            changed.append(b)
+    added = [(pid, p) for pid, p in platforms.items() if old_platforms.get(pid) != p]
+    removed = [pid for pid in old_platforms if pid not in platforms]
+    if not (mask or added or removed):
+        return b""
+    parts = [CHUNK_HEAD.pack(seat, mask, len(added), len(removed)), FIELD_STRUCTS[mask].pack(*changed)]
+    parts += [PLATFORM.pack(pid, *p) for pid, p in added]
+    parts.append(struct.pack(f"<{len(removed)}I", *removed))
+    return b"".join(parts)
+
+
+# Applies a snapshot to states ({seat: state}), replacing the state of every
+# seat it changes. Returns the tick, the input ack and the changed seats.
+def decode_snapshot(payload, states):
+    _, tick, ack, count = SNAPSHOT_HEAD.unpack_from(payload)
+    offset = SNAPSHOT_HEAD.size
+    seats = []
+    for _ in range(count):
+        seat, mask, added, removed = CHUNK_HEAD.unpack_from(payload, offset)
+        offset += CHUNK_HEAD.size
+        fields, platforms = states.get(seat, EMPTY)
+        layout = FIELD_STRUCTS[mask]
+        values = iter(layout.unpack_from(payload, offset))
+        offset += layout.size
+        fields = tuple(next(values) if mask >> bit & 1 else old for bit, old in enumerate(fields))
+        platforms = dict(platforms)
+        for _ in range(added):
+            pid, *platform = PLATFORM.unpack_from(payload, offset)
+            offset += PLATFORM.size
+            platforms[pid] = tuple(platform)
+        for pid in struct.unpack_from(f"<{removed}I", payload, offset):
+            del platforms[pid]
+        offset += 4 * removed
+        states[seat] = (fields, platforms)
+        seats.append(seat)
+    return tick, ack, seats
+
+
+async def read_message(reader):
+    size, = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return await reader.readexactly(size)
+
+
+# Framed messages to one peer, optionally held back by a simulated one-way
+# latency plus up to jitter seconds more. Held messages still go out in order.
+class Link:
+    def __init__(self, writer, latency=0.0, jitter=0.0, rng=random):
+        self.writer = writer
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = rng
+        self.held = collections.deque()
+        self.sent = 0  # bytes, length prefixes included
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send(self, payload):
+        data = FRAME.pack(len(payload)) + payload
+        self.sent += len(data)
+        if not (self.latency or self.jitter):
+            self.write(data)
+            return
+        loop = asyncio.get_running_loop()
+        due = loop.time() + self.latency + self.rng.uniform(0, self.jitter)
+        if self.held:
+            due = max(due, self.held[-1][0])
+        self.held.append((due, data))
+        loop.call_at(due, self.flush)
+
+    def flush(self):
+        now = asyncio.get_running_loop().time()
+        while self.held and self.held[0][0] <= now:
+            self.write(self.held.popleft()[1])
+
+    def write(self, data):
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    # Waits for held messages to go out, then closes
+    async def close(self):
+        if self.held:
+            await asyncio.sleep(max(0.0, self.held[-1][0] - asyncio.get_running_loop().time()))
+            self.flush()
+        self.writer.close()
+
+
+# Authoritative game host. Seats fill in connection order and play starts,
+# with a full snapshot, once every seat is taken.
+class Server:
+    def __init__(self, seats=2, seed=None, latency=0.0, jitter=0.0, snapshot_every=SNAPSHOT_EVERY):
+        self.seats = max(1, min(seats, MAX_SEATS))
+        self.seed = session_seed() if seed is None else seed
+        self.latency, self.jitter = latency, jitter
+        self.snapshot_every = snapshot_every
+        self.batch = TowerBatch(self.seats, split.FIELD_WIDTH, split.FIELD_HEIGHT)  # clients show seats in split screen
+        self.batch.reset(self.seed)
+        self.links = [None] * self.seats
+        self.names = [""] * self.seats
+        self.inputs = [collections.deque() for _ in range(self.seats)]  # (sequence, mask) not yet applied
+        self.acks = [0] * self.seats  # last sequence applied per seat
+        self.masks = [0] * self.seats
+        self.states = [EMPTY] * self.seats  # as of the last snapshot
+        self.full = asyncio.Event()
+        self.tick_count = 0
+        self.tick_times = []  # seconds spent in each tick()
+        self.server = None
+
+    # Returns the port actually bound, for port 0
+    async def start(self, host="0.0.0.0", port=PORT):
+        self.server = await asyncio.start_server(self.connected, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def connected(self, reader, writer):
+        # a seat freed mid-game has forfeited, and a newcomer's snapshots
+        # would be deltas against states it never had, so once the game has
+        # started the table stays closed
+        if None not in self.links or self.full.is_set():
+            writer.close()
+            return
+        seat = self.links.index(None)
+        link = Link(writer, self.latency, self.jitter)
+        self.links[seat] = link
+        try:
+            hello = await read_message(reader)
+            self.names[seat] = hello[1:].decode(errors="replace")
+            link.send(WELCOME_MSG.pack(WELCOME, seat, self.seats, STEP_RATE, self.snapshot_every,
+                                       self.batch.width, self.batch.height, self.seed))
+            if None not in self.links:
+                self.full.set()
+            while True:
+                payload = await read_message(reader)
+                if payload[0] == INPUT:
+                    _, seq, mask = INPUT_MSG.unpack(payload)
+                    self.inputs[seat].append((seq, mask))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.links[seat] = None
+        if self.full.is_set():
+            self.batch.game_over[seat] = True  # leaving mid-game forfeits; otherwise the seat is free again
+        writer.close()
+
+    # Applies the next input of every seat that has one, plus extra steps for
+    # any seat that has fallen INPUT_BACKLOG inputs behind
+    def tick(self):
+        start = time.perf_counter()
+        batch, inputs = self.batch, self.inputs
+        active = [bool(queue) for queue in inputs]
+        while any(active):
+            for seat, queue in enumerate(inputs):
+                if active[seat]:
+                    self.acks[seat], self.masks[seat] = queue.popleft()
+            batch.step(self.masks, active)
+            active = [len(queue) > INPUT_BACKLOG for queue in inputs]
+        self.tick_count += 1
+        if self.tick_count % self.snapshot_every == 0:
+            self.snapshot()
+        self.tick_times.append(time.perf_counter() - start)
+
+    def snapshot(self):
+        states = batch_states(self.batch)
+        chunks = [encode_delta(seat, old, new) for seat, (old, new) in enumerate(zip(self.states, states))]
+        self.states = states
+        for seat, link in enumerate(self.links):
+            if link is None:
+                continue
+            body = [chunks[s] for s in view_seats(seat, self.seats) if chunks[s]]
+            link.send(SNAPSHOT_HEAD.pack(SNAPSHOT, self.tick_count, self.acks[seat], len(body)) + b"".join(body))
+
+    def finished(self):
+        return bool((self.batch.game_over | self.batch.win).all())
+
+    # Plays until every game has ended or for ticks ticks, then sends the
+    # final state and says goodbye
+    async def run(self, ticks=None):
+        await self.full.wait()
+        loop = asyncio.get_running_loop()
+        self.snapshot()
+        due = loop.time()
+        while not self.finished() and (ticks is None or self.tick_count < ticks):
+            self.tick()
+            due += 1 / STEP_RATE
+            await asyncio.sleep(max(0.0, due - loop.time()))
+        self.snapshot()
+        links = [link for link in self.links if link is not None]
+        for link in links:
+            link.send(bytes([BYE]))
+        await asyncio.gather(*(link.close() for link in links))
+        self.server.close()
+        await self.server.wait_closed()
+
+
+# One seat's connection. Steps its own game ahead of the server on a local
+# TowerEngine (prediction) and keeps every input the server hasn't applied
+# yet; each snapshot puts that engine back in the server's state for the seat
+# and replays the pending inputs on top (reconciliation). The engine spawns no
+# platforms of its own, so a platform appears once the server reports it.
+# Other seats are only mirrored from snapshots, for drawing.
+class Client:
+    def __init__(self, name="Player", latency=0.0, jitter=0.0):
+        self.name = name
+        self.latency, self.jitter = latency, jitter
+        self.states = {}  # seat -> state as of the last snapshot
+        self.previous = {}  # seat -> state as of the one before
+        self.pending = collections.deque()  # [sequence, mask, predicted fields] not yet applied by the server
+        self.seq = 0
+        self.snapshot_time = 0.0
+        self.started = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.received = 0  # bytes, length prefixes included
+        self.snapshots = 0
+        self.checked = 0  # snapshots that acknowledged a predicted step
+        self.mispredictions = 0
+
+    async def connect(self, host, port=PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        self.link = Link(writer, self.latency, self.jitter)
+        self.link.send(bytes([HELLO]) + self.name.encode()[:32])
+        welcome = await read_message(reader)
+        self.received += FRAME.size + len(welcome)
+        _, self.seat, self.seats, step_rate, self.snapshot_every, width, height, self.seed = WELCOME_MSG.unpack(welcome)
+        self.view = view_seats(self.seat, self.seats)
+        self.engine = TowerEngine(width, height, platform_limit=0)
+        self.receiver = asyncio.create_task(self.receive(reader))
+
+    async def receive(self, reader):
+        try:
+            while True:
+                payload = await read_message(reader)
+                self.received += FRAME.size + len(payload)
+                if payload[0] == SNAPSHOT:
+                    self.on_snapshot(payload)
+                elif payload[0] == BYE:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        self.closed.set()
+        self.link.writer.close()
+
+    def on_snapshot(self, payload):
+        previous = dict(self.states)
+        tick, ack, seats = decode_snapshot(payload, self.states)
+        for seat in seats:
+            self.previous[seat] = previous.get(seat, self.states[seat])
+        self.snapshot_time = time.perf_counter()
+        self.snapshots += 1
+        self.reconcile(ack)
+        self.started.set()
+
+    def reconcile(self, ack):
+        pending = self.pending
+        predicted = None
+        while pending and pending[0][0] <= ack:
+            predicted = pending.popleft()
+        state = self.states[self.seat]
+        if predicted is not None and predicted[0] == ack:
+            self.checked += 1
+            if predicted[2] != state[0]:
+                self.mispredictions += 1
+        load_state(self.engine, state)
+        for entry in pending:
+            entry[2] = self.predict(entry[1])
+
+    def predict(self, mask):
+        engine = self.engine
+        if not (engine.game_over or engine.win):
+            engine.step(mask)
+        return engine.state_fields()
+
+    # The server's word on whether this seat's game has ended
+    def finished(self):
+        state = self.states.get(self.seat)
+        return state is not None and state[0][7] & (GAME_OVER | WIN)
+
+    # One local step: send this step's input and predict its outcome
+    def tick(self, mask):
+        if self.closed.is_set() or self.finished():
+            return
+        self.seq += 1
+        self.link.send(INPUT_MSG.pack(INPUT, self.seq, mask))
+        self.pending.append([self.seq, mask, self.predict(mask)])
+
+    # Fraction of a snapshot interval since the last one, for drawing other seats
+    def snapshot_alpha(self):
+        return min((time.perf_counter() - self.snapshot_time) * STEP_RATE / self.snapshot_every, 1.0)
+
+    async def close(self):
+        await self.link.close()
+        await self.receiver
+
+
+# What the split-screen Players draw in a networked game: viewport k shows
+# seat client.view[k], the client's own seat first and as predicted, the rest
+# interpolated between their last two snapshots
+class NetView:
+    def __init__(self, client):
+        self.client = client
+        self.ball_radius = client.engine.ball_radius
+
+    def fields(self, k):
+        return self.client.states[self.client.view[k]][0]
+
+    @property
+    def score(self):
+        return [self.client.engine.score] + [self.fields(k)[5] for k in range(1, len(self.client.view))]
+
+    @property
+    def level(self):
+        return [self.client.engine.level] + [self.fields(k)[6] for k in range(1, len(self.client.view))]
+
+    @property
+    def game_over(self):
+        return [self.fields(k)[7] & GAME_OVER for k in range(len(self.client.view))]
+
+    @property
+    def win(self):
+        return [self.fields(k)[7] & WIN for k in range(len(self.client.view))]
+
+    def visible_platforms(self, k, alpha=1.0):
+        engine = self.client.engine
+        if k == 0:
+            return engine.visible_platforms(alpha)
+        seat = self.client.view[k]
+        (_, _, _, camera, *_), platforms = self.client.states[seat]
+        prev_camera = self.client.previous[seat][0][3]
+        offset = int(lerp(prev_camera, camera, self.client.snapshot_alpha()))
+        return [pygame.Rect(x, y + offset, engine.pw, engine.ph) for x, y, _, _ in platforms.values()]
+
+    def ball_position(self, k, alpha=1.0):
+        if k == 0:
+            return self.client.engine.ball_position(alpha)
+        seat = self.client.view[k]
+        x, y = self.client.states[seat][0][:2]
+        prev_x, prev_y = self.client.previous[seat][0][:2]
+        alpha = self.client.snapshot_alpha()
+        return int(lerp_x(prev_x, x, alpha, self.client.engine.width)), int(lerp(prev_y, y, alpha))
+
+
+def draw_waiting(screen, client):
+    screen.fill(split.BLACK)
+    text = split.render_text(split.big_font, f"Seat {client.seat + 1} of {client.seats}", split.WHITE)
+    screen.blit(text, (split.WIDTH // 2 - text.get_width() // 2, split.HEIGHT // 2 - 40))
+    text = split.render_text(split.font, "Waiting for the other players...", split.WHITE)
+    screen.blit(text, (split.WIDTH // 2 - text.get_width() // 2, split.HEIGHT // 2 + 10))
+    pygame.display.flip()
+
+
+# The game window for a connected client, drawn with the split-screen
+# Players. Runs on the event loop alongside the client's network reads.
+# Unless keys gives a (left, right) pair, seat n is steered with the keys
+# the local split screen gives player n, GAMES_KEYS included, so clients
+# sharing a machine each get their own.
+async def play(client, keys=None):
+    screen = pygame.display.set_mode((split.WIDTH, split.HEIGHT))
+    pygame.display.set_caption(f"Tower Jump - Online ({client.name})")
+    split.screen = screen
+    viewports = split.layout(len(client.view))
+    left, right = keys or split.key_bindings(split.MAX_PLAYERS)[client.seat % split.MAX_PLAYERS]
+    names = [client.name] + [f"Player {seat + 1}" for seat in client.view[1:]]
+    split.players[:] = [split.Player(k, names[k], left, right, viewports[k]) for k in range(len(client.view))]
+    split.batch = NetView(client)
+
+    loop = asyncio.get_running_loop()
+    timestep = FixedTimestep()
+    due = loop.time()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or event.type == pygame.KEYDOWN and event.key == pygame.K_q:
+                return
+        if not client.started.is_set():
+            draw_waiting(screen, client)
+            timestep.reset()
+        else:
+            mask = split.players[0].inputs(pygame.key.get_pressed())
+            for _ in range(timestep.steps()):
+                client.tick(mask)
+            split.draw_frame(timestep.alpha)
+        due = max(due + 1 / split.FPS, loop.time())
+        await asyncio.sleep(due - loop.time())
+
+
+async def serve(args):
+    server = Server(args.seats, args.seed, args.latency / 1000, args.jitter / 1000)
+    port = await server.start(args.host, args.port)
+    print(f"Tower Jump server on port {port}, seed {server.seed}: waiting for {server.seats} players")
+    await server.full.wait()
+    print("All seats taken: " + ", ".join(server.names))
+    await server.run()
+    for seat, (fields, _) in enumerate(server.states):
+        print(f"{server.names[seat]}: score {fields[5]}, level {fields[6]}")
+
+
+async def join(args):
+    client = Client(args.name, args.latency / 1000, args.jitter / 1000)
+    try:
+        await client.connect(args.host, args.port)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        print(f"{args.host}:{args.port} turned us away: every seat is taken or the game has started")
+        return
+    keys = split.key_bindings(1, args.keys)[0] if args.keys else None
+    try:
+        await play(client, keys)
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Networked Tower Jump")
+    commands = parser.add_subparsers(dest="command", required=True)
+    host = commands.add_parser("serve", help="host a game")
+    host.add_argument("--seats", type=int, default=2, help=f"players to wait for (up to {MAX_SEATS})")
+    host.add_argument("--host", default="0.0.0.0")
+    host.add_argument("--seed", type=int)
+    guest = commands.add_parser("join", help="join a hosted game")
+    guest.add_argument("host", nargs="?", default="127.0.0.1")
+    guest.add_argument("--name", default="Player")
+    guest.add_argument("--keys", help='left and right key names, e.g. "left,right" '
+                                      "(default: this seat's keys in the split-screen game)")
+    for command in (host, guest):
+        command.add_argument("--port", type=int, default=PORT)
+        command.add_argument("--latency", type=float, default=0.0, help="simulated one-way latency in ms")
+        command.add_argument("--jitter", type=float, default=0.0, help="extra random delay of up to this many ms")
+    args = parser.parse_args()
+    asyncio.run(serve(args) if args.command == "serve" else join(args))
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import random
+import sys
+import time
+
+from tower_engine import TowerEngine, LEFT, RIGHT, chase_policy, run_batch
+
+STEP = 5  # horizontal pixels per step while LEFT or RIGHT is held
+
+
+# Vertical flight of the ball from (y, vy), one (y, vy) pair per future step,
+# following TowerEngine.step, until it has fallen below y + depth
+def flight(y, vy, gravity, depth):
+    path = []
+    limit = y + depth
+    while vy <= 0 or y < limit:
+        vy += gravity
+        y += vy
+        path.append((y, vy))
+    return path
+
+
+# Reachability between platforms, from the engine's own physics. The ball's
+# vertical path doesn't depend on steering, so for a jump off platform A the
+# only question about platform B is whether the ball can cover the sideways
+# distance in the steps during which it falls through B's height. Jumps are
+# tabulated once per difficulty by height gap, which makes a pair check a
+# lookup and an interval distance.
+class ReachabilityChecker:
+    def __init__(self, engine):
+        self.width = engine.width
+        self.height = engine.height
+        self.r = engine.ball_radius
+        self.pw, self.ph = engine.pw, engine.ph
+        self.gravity = engine.gravity
+        self.jump_power = engine.jump_power
+        self.wrap = self.width + 2 * self.r + STEP  # x positions repeat with this period
+        self.tables = {}
+
+    # Steps in which a ball in flight can land on a platform whose top is
+    # `top` px below the flight's start, last one first
+    def landing_steps(self, path, top):
+        r, ph = self.r, self.ph
+        steps = []
+        for k in range(len(path) - 1, -1, -1):
+            y, vy = path[k]
+            if vy > 0 and int(y - r) < top + ph and int(y - r) + 2 * r > top:
+                steps.append(k + 1)
+        return steps
+
+    # Deepest point at which a ball bouncing on a platform settles into
+    # landing, relative to its top; the worst case for the next jump
+    def landing_depth(self, difficulty):
+        gravity = self.gravity * difficulty
+        y, vy, deepest = -self.r - 1.0, 0.0, None
+        for _ in range(8):
+            path = flight(y, vy, gravity, 2 * self.r + self.ph)
+            k = self.landing_steps(path, 0)[-1]
+            y = path[k - 1][0]
+            vy = self.jump_power * difficulty
+            deepest = y if deepest is None else max(deepest, y)
+        return deepest
+
+    # For each gap (A's top minus B's top), the latest step of a jump off A at
+    # which the ball can still land on B, or 0 if it never passes B falling
+    def table(self, difficulty):
+        table = self.tables.get(difficulty)
+        if table is None:
+            path = flight(self.landing_depth(difficulty), self.jump_power * difficulty,
+                          self.gravity * difficulty, self.height)
+            apex = -int(min(y for y, _ in path)) + 2 * self.r + self.ph
+            table = []
+            for gap in range(apex + 1):
+                steps = self.landing_steps(path, -gap)
+                table.append(steps[0] if steps else 0)
+            table = self.tables[difficulty] = table
+        return table
+
+    # Ball x values that overlap a platform starting at left
+    def landing_span(self, left):
+        return left - self.r + 1, left + self.pw + self.r - 1
+
+    # Sideways travel needed to get from span a to span b, across the wrap
+    def distance(self, a, b):
+        best = None
+        for shift in (-self.wrap, 0, self.wrap):
+            lo, hi = b[0] + shift, b[1] + shift
+            if hi < a[0]:
+                d = a[0] - hi
+            elif lo > a[1]:
+                d = lo - a[1]
+            else:
+                return 0
+            best = d if best is None else min(best, d)
+        return best
+
+    # Point of span a closest to span b, kept a step inside a's edges
+    def nearest(self, a, b):
+        lo, hi = a[0] + STEP, a[1] - STEP
+        best = None
+        for shift in (-self.wrap, 0, self.wrap):
+            b_lo, b_hi = b[0] + shift, b[1] + shift
+            if b_hi < lo:
+                d, x = lo - b_hi, lo
+            elif b_lo > hi:
+                d, x = b_lo - hi, hi
+            else:
+                d, x = 0, max(lo, b_lo)
+            if best is None or d < best[0]:
+                best = (d, x)
+        return best[1]
+
+    def reachable(self, a, b, difficulty):
+        table = self.table(difficulty)
+        gap = a.top - b.top
+        if gap < 0 or gap >= len(table) or not table[gap]:
+            return False
+        return self.distance(self.landing_span(a.x), self.landing_span(b.x)) <= STEP * table[gap]
+
+    # Index of the first platform (listed bottom up) that can't be reached
+    # from the one below it, counting the floor as the first, or None
+    def check(self, layout, difficulty):
+        floor = (-self.wrap, self.width + self.wrap)
+        first_jump = flight(self.height - self.r, self.jump_power, self.gravity * difficulty, self.height)
+        first = layout[0]
+        steps = self.landing_steps(first_jump, first.top)
+        if not steps or self.distance(floor, self.landing_span(first.x)) > STEP * steps[0]:
+            return 0
+        for i in range(1, len(layout)):
+            if not self.reachable(layout[i - 1], layout[i], difficulty):
+                return i
+        return None
+
+
+# Platform layouts exactly as spawn_platforms builds them, bottom up
+def generate_layouts(count, length=50, seed=0):
+    engine = TowerEngine(rng=random.Random(seed), platform_limit=length)
+    for _ in range(count):
+        engine.reset()
+        pool = engine.pool
+        yield [pool.rects[i] for i in reversed(pool.index.slots)]
+
+
+# Autopilot that searches the known platforms for the best climb. At each
+# bounce it works out which platforms the current jump can reach, scores each
+# by the highest platform reachable from it through further jumps, and steers
+# for the best one, aiming for the part of it closest to the jump after; between
+# bounces it just follows that plan.
+class Planner:
+    def __init__(self, engine):
+        self.checker = ReachabilityChecker(engine)
+        self.target = None
+        self.target_id = None
+        self.aim = None
+        self.last_vy = 0
+
+    def __call__(self, engine):
+        pool = engine.pool
+        bounced = engine.ball_speed_y < self.last_vy
+        self.last_vy = engine.ball_speed_y
+        if bounced or self.target is None or pool.ids[self.target] != self.target_id:
+            self.plan(engine)
+        if self.target is None:
+            return chase_policy(engine)
+        dx = (self.aim - engine.ball_x) % self.checker.wrap
+        if dx > self.checker.wrap / 2:
+            dx -= self.checker.wrap
+        if dx > STEP // 2:
+            return RIGHT
+        if dx < -(STEP // 2):
+            return LEFT
+        return 0
+
+    def plan(self, engine):
+        checker = self.checker
+        pool = engine.pool
+        rects = pool.rects
+        difficulty = engine.difficulty()
+        y = engine.ball_y - engine.view_offset()
+        path = flight(y, engine.ball_speed_y, checker.gravity * difficulty, engine.height)
+        ball = (engine.ball_x, engine.ball_x)
+
+        # top of the highest platform each platform leads to, and the next
+        # platform on the way there, working down from the top of the tower
+        slots = pool.index.slots
+        best, via = {}, {}
+        for i, slot in enumerate(slots):
+            top, via[slot] = rects[slot].top, None
+            for higher in slots[:i]:
+                if best[higher] < top and checker.reachable(rects[slot], rects[higher], difficulty):
+                    top, via[slot] = best[higher], higher
+            best[slot] = top
+
+        choice = None
+        for slot in slots:
+            steps = checker.landing_steps(path, rects[slot].top)
+            if not steps or checker.distance(ball, checker.landing_span(rects[slot].x)) > STEP * steps[0]:
+                continue
+            score = (best[slot], rects[slot].top)
+            if choice is None or score < choice[0]:
+                choice = (score, slot, steps[0])
+        if choice is None:
+            self.target = None
+            return
+        target = self.target = choice[1]
+        self.target_id = pool.ids[target]
+        span = checker.landing_span(rects[target].x)
+        after = via[target]
+        if after is None:
+            self.aim = rects[target].centerx
+        else:
+            self.aim = checker.nearest(span, checker.landing_span(rects[after].x))
+        if checker.distance(ball, (self.aim, self.aim)) > STEP * choice[2]:
+            self.aim = checker.nearest(span, ball)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "check":
+        # python tower_planner.py check [layouts] [platforms per layout]
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+        length = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+        layouts = list(generate_layouts(count, length))
+        engine = TowerEngine()
+        checker = ReachabilityChecker(engine)
+        for level in range(1, 100, 10):
+            engine.level = level
+            difficulty = engine.difficulty()
+            start = time.perf_counter()
+            failures = sum(checker.check(layout, difficulty) is not None for layout in layouts)
+            elapsed = time.perf_counter() - start
+            print(f"level {level:2}: {failures}/{count} layouts of {length} have an unreachable platform "
+                  f"({count / elapsed:.0f} layouts/s)")
+    else:
+        # python tower_planner.py play [frames]
+        frames = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+        for name in ("chase", "planner"):
+            engine = TowerEngine(rng=random.Random(0))
+            policy = Planner(engine) if name == "planner" else chase_policy
+            stats = run_batch(frames, policy, engine)
+            print(f"{name:8} {stats['frames']} frames in {stats['seconds']:.2f}s "
+                  f"({stats['fps']:.0f} FPS), {stats['games']} games, best level {stats['best_level']}")